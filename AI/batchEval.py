@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+import numpy as np
+import chess
+from AI.evalTable import EvalTable, KING_END_OFFSET, table_index
+
+"""
+Batched evaluation of piece square table models with NumPy.
+
+A position is encoded as 12 bit planes of 64 squares (plane color * 6 + piece_type - 1,
+the same layout as EvalTable.values) and a model as a weight vector over those 768 bits,
+so scoring N positions is a single (N, 768) x (768,) product and scoring them for P
+models at once is a single (N, 768) x (768, P) product.
+"""
+
+NUM_FEATURES = 2 * 6 * 64
+
+"""
+The 12 piece bitboards of a position in plane order
+"""
+def bitboards(board: chess.Board):
+    black, white = board.occupied_co
+    return (board.pawns & black, board.knights & black, board.bishops & black,
+            board.rooks & black, board.queens & black, board.kings & black,
+            board.pawns & white, board.knights & white, board.bishops & white,
+            board.rooks & white, board.queens & white, board.kings & white)
+
+"""
+(N, 768) array of 0 / 1 bit planes from a list of bitboards() tuples
+"""
+def planes(positions: list):
+    packed = np.array(positions, dtype="<u8").reshape(len(positions), 12)
+    bits = np.unpackbits(packed.view(np.uint8).reshape(len(positions), 12, 8), axis=2, bitorder="little")
+    return bits.reshape(len(positions), NUM_FEATURES)
+
+def board_planes(boards: list):
+    return planes([bitboards(board) for board in boards])
+
+"""
+(768,) weights scoring the pieces of one color of an EvalTable, the other color is weighted 0
+"""
+def weights(eval_table: EvalTable, color: chess.Color, endgame=False):
+    w = np.zeros(NUM_FEATURES, dtype=np.float64)
+    start = table_index(color, chess.PAWN, 0)
+    w[start:start + 6 * 64] = eval_table.values[start:start + 6 * 64]
+    if endgame:
+        king = table_index(color, chess.KING, 0)
+        w[king:king + 64] = eval_table.values[KING_END_OFFSET + color * 64:KING_END_OFFSET + color * 64 + 64]
+    return w
+
+"""
+(768, P) weights of P models, e.g. a whole EvoTableAI population
+"""
+def weight_matrix(eval_tables: list, color: chess.Color, endgame=False):
+    return np.stack([weights(eval_table, color, endgame) for eval_table in eval_tables], axis=1)
+
+"""
+Scores of positions for one model ((768,) weights -> (N,)) or many ((768, P) weights -> (N, P))
+"""
+def score_planes(position_planes: np.ndarray, model_weights: np.ndarray):
+    return position_planes.astype(model_weights.dtype) @ model_weights
+
+"""
+Scores the leaves of a search for one model and color in batches
+"""
+class BatchEvaluator():
+
+    def __init__(self, eval_table: EvalTable, color: chess.Color, endgame=False):
+        self.color = color
+        self.weights = weights(eval_table, color, endgame)
+
+    def evaluate(self, positions: list):
+        if len(positions) == 0:
+            return []
+        return score_planes(planes(positions), self.weights).tolist()
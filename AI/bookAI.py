@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+
+from AI.playerAI import PlayerAI
+from AI.openingBook import OpeningBook
+import chess
+import random
+
+"""
+Plays from an opening book before handing over to another AI.
+Out of book, the moves the AI chooses in the first max_ply plies are recorded
+(with its search score if it has one) so the book grows as games are played.
+In-book positions are still searched now and then (explore) so the book learns more than
+the first move chosen in each position.
+Call save() to write recorded moves to the book file.
+"""
+class BookAI(PlayerAI):
+
+    def __init__(self, player: PlayerAI, book_path="opening_book.bin", max_ply=16, weighted_random=True, record=True,
+                 explore=0.1):
+        self.name = "{} + Book".format(player.name)
+        self.player = player
+        self.book = OpeningBook(book_path)
+        self.max_ply = max_ply
+        # Pick book moves at random weighted by how often they were played to keep games varied
+        self.weighted_random = weighted_random
+        self.record = record
+        # Chance of searching an in-book position instead of playing a book move
+        self.explore = explore
+        self.book_moves = 0
+
+    def new_game(self):
+        self.player.new_game()
+
+    def stop(self):
+        self.player.stop()
+
+    def ponder(self, board: chess.Board):
+        self.player.ponder(board)
+
+    def make_move(self, board: chess.Board):
+        in_opening = board.ply() < self.max_ply
+        if in_opening and not (self.record and random.random() < self.explore):
+            move = self.book.choose(board, weighted_random=self.weighted_random, rng=random)
+            if move is not None:
+                self.book_moves += 1
+                return move
+
+        move = self.player.make_move(board)
+        if in_opening and self.record and move is not None:
+            self.book.record(board, move, score=getattr(self.player, "best_score", 0))
+        return move
+
+    def save(self, path=None):
+        self.book.save(path)
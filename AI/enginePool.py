@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import asyncio
+import threading
+import chess.engine
+
+DEFAULT_SF_PATH = "/opt/homebrew/bin/stockfish"
+
+"""
+Pools of long-lived UCI engine processes.
+
+Starting an engine and waiting for `uciok` costs far more than a short search,
+so engines are started once and leased out (per game for StockfishAI) instead.
+Engines are shared by players with different settings, so options such as UCI_Elo
+are sent with every search and python-chess only sends the ones that changed.
+Positions go over as the start position plus the move list, with `ucinewgame`
+whenever an engine starts searching for a different game.
+
+An engine command is a path or an argument list, e.g. [sys.executable, "AI/fakeUCI.py"].
+"""
+
+"""
+Command of the Stockfish engine: the given path, $STOCKFISH_PATH, stockfish on the PATH
+or the Homebrew install location
+"""
+def engine_path(path=None):
+    return path or os.environ.get("STOCKFISH_PATH") or shutil.which("stockfish") or DEFAULT_SF_PATH
+
+def is_alive(engine):
+    return not engine.protocol.returncode.done()
+
+class EnginePool():
+
+    def __init__(self, command, max_idle=8):
+        self.command = command
+        # Idle engines kept for reuse, any more are shut down when released
+        self.max_idle = max_idle
+        self.idle = []
+        # Every running engine, leased or idle
+        self.engines = []
+        self.lock = threading.Lock()
+
+    def lease(self) -> chess.engine.SimpleEngine:
+        with self.lock:
+            while self.idle:
+                engine = self.idle.pop()
+                if is_alive(engine):
+                    return engine
+        engine = chess.engine.SimpleEngine.popen_uci(self.command)
+        with self.lock:
+            self.engines = [e for e in self.engines if is_alive(e)] + [engine]
+        return engine
+
+    def release(self, engine: chess.engine.SimpleEngine):
+        if not is_alive(engine):
+            return
+        with self.lock:
+            if len(self.idle) < self.max_idle:
+                self.idle.append(engine)
+                return
+            self.engines.remove(engine)
+        engine.quit()
+
+    """
+    Shut down every engine of the pool, including leased ones
+    """
+    def close(self):
+        with self.lock:
+            engines, self.engines, self.idle = self.engines, [], []
+        for engine in engines:
+            try:
+                engine.quit()
+            except chess.engine.EngineError:
+                engine.close()
+
+"""
+EnginePool for asyncio code, engines are bound to the event loop they were started in
+"""
+class AsyncEnginePool():
+
+    def __init__(self, command, max_idle=8):
+        self.command = command
+        self.max_idle = max_idle
+        self.idle = []
+
+    async def lease(self) -> chess.engine.Protocol:
+        while self.idle:
+            engine = self.idle.pop()
+            if not engine.returncode.done():
+                return engine
+        _, engine = await chess.engine.popen_uci(self.command)
+        return engine
+
+    async def release(self, engine: chess.engine.Protocol):
+        if engine.returncode.done():
+            return
+        if len(self.idle) < self.max_idle:
+            self.idle.append(engine)
+        else:
+            await engine.quit()
+
+    async def close(self):
+        idle, self.idle = self.idle, []
+        await asyncio.gather(*(engine.quit() for engine in idle), return_exceptions=True)
+
+# One pool per engine command, engines can't be shared with forked processes
+_pools = {}
+_pid = None
+
+def get_pool(command) -> EnginePool:
+    global _pid
+    if _pid != os.getpid():
+        # Forked from a process with its own engines, start fresh ones here
+        _pools.clear()
+        _pid = os.getpid()
+    key = tuple(command) if isinstance(command, list) else command
+    if key not in _pools:
+        _pools[key] = EnginePool(command)
+    return _pools[key]
+
+def shutdown():
+    if _pid == os.getpid():
+        for pool in _pools.values():
+            pool.close()
+    _pools.clear()
+
+# Each engine is driven by a non-daemon thread, so the engines have to be shut down before
+# the interpreter (or a pool worker process) waits for its threads, which is before atexit
+threading._register_atexit(shutdown)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+import chess
+
+# Offset of the endgame king table after the 2 x 6 x 64 piece tables
+KING_END_OFFSET = 2 * 6 * 64
+
+"""
+Index of a piece on a square in EvalTable.values
+"""
+def table_index(color: chess.Color, type: chess.PieceType, square: chess.Square):
+    return (color * 6 + type - 1) * 64 + square
+
+"""
+Piece values and piece square tables compiled into one flat list of square values.
+
+values[table_index(color, type, square)] is the material value of the piece plus its
+PST value on that square, already mirrored for black, followed by the same 2 x 64 values
+for the endgame king. Compile once per model and again only when its parameters change.
+"""
+class EvalTable():
+
+    def __init__(self, material_val: dict, table: dict, king_end: list = None):
+        if king_end is None:
+            king_end = table[chess.KING]
+
+        self.values = [0] * (KING_END_OFFSET + 2 * 64)
+        for color in chess.COLORS:
+            for type in chess.PIECE_TYPES:
+                pst = table[type] if color == chess.WHITE else list(reversed(table[type]))
+                base = table_index(color, type, 0)
+                for square in chess.SQUARES:
+                    self.values[base + square] = material_val[type] + pst[square]
+            pst = king_end if color == chess.WHITE else list(reversed(king_end))
+            base = KING_END_OFFSET + color * 64
+            for square in chess.SQUARES:
+                self.values[base + square] = material_val[chess.KING] + pst[square]
+
+        self.material_val = [0] + [material_val[type] for type in chess.PIECE_TYPES]
+        # Queen + minor piece + king, more material than this with a queen is not an endgame
+        self.max_material = material_val[chess.BISHOP] + material_val[chess.QUEEN] + material_val[chess.KING]
+
+    """
+    Offsets into values of each piece type of a color, the king offset depends on the stage of the game
+    """
+    def offsets(self, color: chess.Color, endgame=False):
+        offsets = [0] + [table_index(color, type, 0) for type in chess.PIECE_TYPES]
+        if endgame:
+            offsets[chess.KING] = KING_END_OFFSET + color * 64
+        return offsets
+
+    """
+    Material plus positional score of one color
+    """
+    def evaluate(self, board: chess.Board, color: chess.Color, endgame=False):
+        values = self.values
+        offsets = self.offsets(color, endgame)
+        ours = board.occupied_co[color]
+        score = 0
+        for type, mask in ((chess.PAWN, board.pawns), (chess.KNIGHT, board.knights), (chess.BISHOP, board.bishops),
+                           (chess.ROOK, board.rooks), (chess.QUEEN, board.queens), (chess.KING, board.kings)):
+            offset = offsets[type]
+            for square in chess.scan_forward(ours & mask):
+                score += values[offset + square]
+        return score
+
+    def material_value(self, board: chess.Board, color: chess.Color):
+        ours = board.occupied_co[color]
+        material_val = self.material_val
+        return (chess.popcount(ours & board.pawns) * material_val[chess.PAWN]
+                + chess.popcount(ours & board.knights) * material_val[chess.KNIGHT]
+                + chess.popcount(ours & board.bishops) * material_val[chess.BISHOP]
+                + chess.popcount(ours & board.rooks) * material_val[chess.ROOK]
+                + chess.popcount(ours & board.queens) * material_val[chess.QUEEN]
+                + chess.popcount(ours & board.kings) * material_val[chess.KING])
+
+    """
+    Both sides have no queens, or every side which has a queen has additionally
+    no other pieces or one minor piece maximum
+    """
+    def is_endgame(self, board: chess.Board):
+        for color in chess.COLORS:
+            if chess.popcount(board.queens & board.occupied_co[color]) == 1 and self.material_value(board, color) > self.max_material:
+                return False
+        return True
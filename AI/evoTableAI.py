@@ -1,186 +1,158 @@
 #!/usr/bin/env python
 
-import sys
-from AI.playerAI import PlayerAI
+from AI.searchEngine import SearchEngine
+from AI.evalTable import EvalTable
 import chess
 import random
-from math import exp, sqrt
-from concurrent.futures import ThreadPoolExecutor
+import copy
+import uuid
+from math import sqrt
+import numpy as np
 
-INT_MIN = -sys.maxsize - 1
-INT_MAX = sys.maxsize
+# Genome layout: values of pawn to queen, then the PSTs of pawn to king (64 squares each)
+NUM_MATERIAL = len(chess.PIECE_TYPES) - 1
+NUM_PARAMS = NUM_MATERIAL + 64 * len(chess.PIECE_TYPES)
+KING_VALUE = 20000
+TAU = 1 / sqrt(2 * NUM_PARAMS)
 
 """
 Updates piece square tables and piece material values using an evolutionary algorithm
 """
-class EvoTableAI(PlayerAI):
+class EvoTableAI(SearchEngine):
     
-    def __init__(self, depth=2, threads=8, material_val={}, table={},
-                 material_strat_param={}, table_strat_param={}):
-        self.name = "Evo Table (d={})".format(depth)
-        self.depth = depth
-        self.in_endgame = False
-        self.threads = threads
+    def __init__(self, depth=2, threads=8, tt_size_mb=16, time_limit=None, node_limit=None,
+                 quiescence=True, batch_eval=False, stats=False, pvs=True, aspiration=True, null_move=True,
+                 lmr=True, futility=True, ponder=False, genome=None, strat_params=None, material_val=None, table=None,
+                 material_strat_param=None, table_strat_param=None):
+        super().__init__(depth, threads, tt_size_mb, time_limit, node_limit, quiescence, batch_eval, stats,
+                         pvs, aspiration, null_move, lmr, futility, ponder)
+        self.name = "Evo Table (d={})".format(depth) if time_limit is None else "Evo Table (t={}s)".format(time_limit)
         
-        self.num_params = 64 * len(chess.PIECE_TYPES) + len(chess.PIECE_TYPES) - 1
-        self.tau = 1 / sqrt(2 * self.num_params)
+        self.num_params = NUM_PARAMS
+        self.tau = TAU
         
-        self.MATERIAL_VAL = material_val
-        self.MATERIAL_VAL[chess.KING] = 20000
-        self.material_strat_param = material_strat_param
-        self.TABLE = table
-        self.table_strat_param = table_strat_param
-
-        if table == {}:
-            self.init_random()
-       
-    """
-    Init random piece values and PSTs
-    We also initialise strategy parameters for use during mutation
-    """
-    def init_random(self):
-        for type in chess.PIECE_TYPES:
-            if type != chess.KING:
-                self.MATERIAL_VAL[type] = random.randint(0, 1000)
-                self.material_strat_param[type] = random.uniform(0, 0.05)
-            self.TABLE[type] = [random.randint(-50, 50) for _ in range(64)]
-            self.table_strat_param[type] = [random.uniform(0, 0.05) for _ in range(64)]
-    
-    def make_move(self, board: chess.Board):
-        self.in_endgame = self.is_endgame(board)
-
-        legal_moves = list(board.legal_moves)
-        random.shuffle(legal_moves)
-        assert len(legal_moves) > 0
-    
-        # Construct list of class containing move and score to enable threading
-        scores = [MoveScore(move) for move in legal_moves]
+        # Piece values and PSTs (genome) with their strategy parameters for use during mutation
+        if genome is None and table is not None:
+            genome = pack_genome(material_val, table)
+            if material_strat_param is not None and table_strat_param is not None:
+                strat_params = pack_genome(material_strat_param, table_strat_param)
+        if genome is None:
+            genomes, strat = random_genomes(1, default_rng())
+            genome, strat_params = genomes[0], strat[0]
+        if strat_params is None:
+            # Given a genome but no strategy parameters, draw them as random_genomes does
+            strat_params = default_rng().uniform(0, 0.05, size=NUM_PARAMS)
+        self.genome = np.asarray(genome, dtype=np.float32)
+        self.strat_params = np.asarray(strat_params, dtype=np.float32)
+        self.compile()
+
+    @property
+    def MATERIAL_VAL(self):
+        material = {type: float(value) for type, value in zip(chess.PIECE_TYPES, self.genome[:NUM_MATERIAL])}
+        material[chess.KING] = KING_VALUE
+        return material
 
-        pool = ThreadPoolExecutor(max_workers=self.threads)
-        for i, move in enumerate(legal_moves):
-            pool.submit(self.score_move(board, move, scores[i]))
-        pool.shutdown()
-        
-        # Return best move
-        return [ms.move for ms in sorted(scores, key=lambda m_score: m_score.score)][-1]
-
-    def score_move(self, board, move, move_score):
-        board.push(move)
-        move_score.score = self.alphabeta(board, self.depth, color=1-board.turn)
-        board.pop()
-  
-    def alphabeta(self, board: chess.Board, depth, color, alpha=INT_MIN, beta=INT_MAX, mini=True):
-        if board.is_game_over():
-            if board.outcome().winner == None:
-                return 0
-            elif board.outcome().winner == board.turn:
-                return INT_MIN
-            else:
-                return INT_MAX
-    
-        if depth == 0:
-            return self.evaluate_pos(board, color)
+    @property
+    def TABLE(self):
+        return unpack_tables(self.genome)
 
-        legal_moves = list(board.legal_moves)
-        assert len(legal_moves) > 0
+    @property
+    def material_strat_param(self):
+        return {type: float(value) for type, value in zip(chess.PIECE_TYPES, self.strat_params[:NUM_MATERIAL])}
 
-        # Sort by piece to reduce branches explored in alpha-beta pruning
-        legal_moves.sort(key = lambda move: board.piece_at(move.from_square).piece_type)
-        
-        value = INT_MAX if mini else INT_MIN
-        for move in legal_moves:
-            board.push(move)
-            child_score = self.alphabeta(board, depth=depth - 1, color=color, alpha=alpha, beta=beta, mini=not mini)
-            board.pop()
-            if mini:
-                value = min(value, child_score)
-                if value < alpha:
-                    # alpha cutoff
-                    break
-                beta = min(beta, value)
-            else:
-                value = max(value, child_score)
-                if value > beta:
-                    # beta cutoff
-                    break
-                alpha = max(alpha, value)
-
-        return value
+    @property
+    def table_strat_param(self):
+        return unpack_tables(self.strat_params)
     
     """
-    Check if endgame is entered
+    Compile the piece values and PSTs into flat square values, call again whenever the genome changes
     """
-    def is_endgame(self, board: chess.Board):
-        # Both sides have no queens
-        if len(board.pieces(chess.QUEEN, chess.WHITE)) == 0 and len(board.pieces(chess.QUEEN, chess.BLACK)) == 0:
-            return True
-        # Or every side which has a queen has additionally no other pieces or one minorpiece maximum.
-        max_material = self.MATERIAL_VAL[chess.BISHOP] + self.MATERIAL_VAL[chess.QUEEN] + self.MATERIAL_VAL[chess.KING]
-        for color in chess.COLORS:
-            if len(board.pieces(chess.QUEEN, color)) == 1 and self.material_value(color, board) > max_material:
-                return False
-        return True
+    def compile(self):
+        self.eval_table = EvalTable(self.MATERIAL_VAL, self.TABLE)
+
+    def __setstate__(self, state):
+        # Models pickled by older versions lack newer attributes, take those of a new player
+        for name, value in default_state().items():
+            if name not in state:
+                state[name] = uuid.uuid4().hex if name == "tt_id" else copy.deepcopy(value)
+        if "genome" not in state:
+            # Dict based models from before the genome arrays
+            state["genome"] = pack_genome(state.pop("MATERIAL_VAL"), state.pop("TABLE"))
+            state["strat_params"] = pack_genome(state.pop("material_strat_param"), state.pop("table_strat_param"))
+        self.__dict__.update(state)
+        if "eval_table" not in state:
+            self.compile()
+
+    def gen_offspring(self, rng: np.random.Generator = None):
+        genomes, strat = mutate_population(self.genome[np.newaxis], self.strat_params[np.newaxis],
+                                           rng or default_rng(), self.tau)
+        return self.with_genome(genomes[0], strat[0])
 
     """
-    Return the centipawn piece value of a board for a given color
-    """
-    def material_value(self, color: chess.Color, board: chess.Board):
-        material = 0
-        for type in reversed(chess.PIECE_TYPES):
-            pieces = board.pieces(type, color)
-            material += len(pieces) * self.MATERIAL_VAL[type]
-        return material
-            
-    """
-    Evaluate our position using material value and PSTs
+    New player with the same search settings and the given genome
     """
-    def evaluate_pos(self, board: chess.Board, color: chess.Color):
-        material = self.material_value(color, board)
-        positional = 0
-        for type in reversed(chess.PIECE_TYPES):
-            squares = board.pieces(type, color)
-
-            table = self.TABLE[type] if color == chess.WHITE else list(reversed(self.TABLE[type]))
-            
-            for square in squares:
-                positional += table[square]
-
-        return material + positional
-
-    def inc_strat_param(self, s, tau):
-        return s * tau * exp(random.normalvariate(0, 1))
-
-    def gen_offspring(self):
-        child_material_val = {}
-        child_material_strat_param = {}
-        child_table = {}
-        child_table_strat_param = {}
-
-        for type in chess.PIECE_TYPES:
-            # Piece value
-            if type != chess.KING:
-                s = self.material_strat_param[type]
-                s_new = self.inc_strat_param(s, self.tau)
-                child_material_strat_param[type] = s_new
-
-                N = random.normalvariate(mu=0, sigma=s_new)
-                child_material_val[type] = max(0, self.MATERIAL_VAL[type] + N)
-            # PSTs
-            child_table[type] = [0] * 64
-            child_table_strat_param[type] = [0] * 64
-            for i, square in enumerate(self.TABLE[type]):
-                s = self.table_strat_param[type][i]
-                s_new = self.inc_strat_param(s, self.tau)
-                child_table_strat_param[type][i] = s_new
-
-                N = random.normalvariate(mu=0, sigma=s_new)
-                child_table[type][i] = square + N
-        
-        return EvoTableAI(material_val=child_material_val, table=child_table,
-                           material_strat_param=child_material_strat_param, 
-                           table_strat_param=child_table_strat_param)
-
-class MoveScore():
-    def __init__(self, move):
-        self.move = move
-        self.score = INT_MIN
+    def with_genome(self, genome, strat_params):
+        return EvoTableAI(depth=self.depth, threads=self.threads, tt_size_mb=self.tt_size_mb,
+                           time_limit=self.time_limit, node_limit=self.node_limit,
+                           quiescence=self.use_quiescence, batch_eval=self.batch_eval,
+                           stats=self.collect_stats, pvs=self.use_pvs, aspiration=self.use_aspiration,
+                           null_move=self.use_null_move, lmr=self.use_lmr, futility=self.use_futility,
+                           ponder=self.use_ponder, genome=genome, strat_params=strat_params)
+
+# Attributes of a newly constructed EvoTableAI without its genome, see default_state()
+_default_state = None
+
+"""
+Attribute defaults for unpickling old models (shared, copy before use), built from a player
+with a zero genome so no random state is used
+"""
+def default_state():
+    global _default_state
+    if _default_state is None:
+        zeros = np.zeros(NUM_PARAMS, dtype=np.float32)
+        state = EvoTableAI(genome=zeros, strat_params=zeros).__getstate__()
+        for name in ("genome", "strat_params", "eval_table"):
+            del state[name]
+        _default_state = state
+    return _default_state
+
+"""
+NumPy generator seeded from the random module, so seeding random makes runs reproducible
+"""
+def default_rng():
+    return np.random.default_rng(random.getrandbits(64))
+
+"""
+Random genomes and strategy parameters of a population as two (size, NUM_PARAMS) float32 arrays
+Piece values are drawn from [0, 1000], PST values from [-50, 50] and strategy parameters from [0, 0.05)
+"""
+def random_genomes(size, rng: np.random.Generator):
+    genomes = np.empty((size, NUM_PARAMS), dtype=np.float32)
+    genomes[:, :NUM_MATERIAL] = rng.integers(0, 1000, size=(size, NUM_MATERIAL), endpoint=True)
+    genomes[:, NUM_MATERIAL:] = rng.integers(-50, 50, size=(size, NUM_PARAMS - NUM_MATERIAL), endpoint=True)
+    strat_params = rng.uniform(0, 0.05, size=(size, NUM_PARAMS)).astype(np.float32)
+    return genomes, strat_params
+
+"""
+Self-adaptive mutation of a whole (P, NUM_PARAMS) population in one step
+Each strategy parameter s becomes s * tau * exp(N(0, 1)) and each parameter is moved by N(0, s)
+"""
+def mutate_population(genomes: np.ndarray, strat_params: np.ndarray, rng: np.random.Generator, tau=TAU):
+    child_strat_params = strat_params * np.float32(tau) * np.exp(rng.standard_normal(strat_params.shape, dtype=np.float32))
+    children = genomes + rng.standard_normal(genomes.shape, dtype=np.float32) * child_strat_params
+    # Piece values can't go negative
+    np.maximum(children[:, :NUM_MATERIAL], 0, out=children[:, :NUM_MATERIAL])
+    return children, child_strat_params
+
+"""
+Genome array from piece value and PST dicts
+"""
+def pack_genome(material_val: dict, table: dict):
+    genome = [material_val[type] for type in chess.PIECE_TYPES if type != chess.KING]
+    for type in chess.PIECE_TYPES:
+        genome += list(table[type])
+    return np.array(genome, dtype=np.float32)
+
+def unpack_tables(genome: np.ndarray):
+    return {type: genome[NUM_MATERIAL + i * 64:NUM_MATERIAL + (i + 1) * 64].tolist()
+            for i, type in enumerate(chess.PIECE_TYPES)}
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+import sys
+import random
+import chess
+
+"""
+Minimal UCI engine standing in for Stockfish when it isn't installed.
+Answers the handshake, accepts the options StockfishAI sets and plays a
+random legal move (the same one for the same position), e.g.
+
+    StockfishAI(sf_path=[sys.executable, "AI/fakeUCI.py"])
+"""
+
+OPTIONS = [
+    "option name Threads type spin default 1 min 1 max 1024",
+    "option name Hash type spin default 16 min 1 max 33554432",
+    "option name UCI_LimitStrength type check default false",
+    "option name UCI_Elo type spin default 1320 min 1320 max 3190",
+]
+
+def send(line):
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
+def set_position(tokens):
+    if tokens[0] == "startpos":
+        board = chess.Board()
+        tokens = tokens[1:]
+    else:
+        end = tokens.index("moves") if "moves" in tokens else len(tokens)
+        board = chess.Board(" ".join(tokens[1:end]))
+        tokens = tokens[end:]
+    for move in tokens[1:]:
+        board.push_uci(move)
+    return board
+
+def main():
+    board = chess.Board()
+    for line in sys.stdin:
+        tokens = line.split()
+        if not tokens:
+            continue
+        command = tokens[0]
+        if command == "uci":
+            send("id name FakeUCI")
+            send("id author evoChess")
+            for option in OPTIONS:
+                send(option)
+            send("uciok")
+        elif command == "isready":
+            send("readyok")
+        elif command == "ucinewgame":
+            board = chess.Board()
+        elif command == "position":
+            board = set_position(tokens[1:])
+        elif command == "go":
+            moves = list(board.legal_moves)
+            if moves:
+                move = random.Random(board.fen()).choice(moves)
+                send("info depth 1 score cp 0 nodes {} pv {}".format(len(moves), move.uci()))
+                send("bestmove {}".format(move.uci()))
+            else:
+                send("bestmove (none)")
+        elif command == "quit":
+            break
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+import chess
+from AI.evalTable import EvalTable
+
+"""
+Material plus piece square table score of both colors, kept up to date as moves are
+pushed and popped instead of being rebuilt from the whole board at every leaf.
+
+Square values come from a compiled EvalTable (material folded in, mirrored for black).
+The search must make its moves through push / pop so the scores follow the board.
+"""
+class IncrementalEval():
+
+    def __init__(self, eval_table: EvalTable, endgame=False):
+        self.eval_table = eval_table
+        self.endgame = endgame
+        self.values = eval_table.values
+        # offsets[color][piece_type] into values
+        self.offsets = [eval_table.offsets(chess.BLACK, endgame), eval_table.offsets(chess.WHITE, endgame)]
+        self.scores = [0, 0]
+        self.stack = []
+
+    """
+    Compute the scores of a position from scratch
+    """
+    def reset(self, board: chess.Board):
+        self.stack = []
+        for color in chess.COLORS:
+            self.scores[color] = self.eval_table.evaluate(board, color, self.endgame)
+
+    def score(self, color: chess.Color):
+        return self.scores[color]
+
+    def push(self, board: chess.Board, move: chess.Move):
+        scores = self.scores
+        self.stack.append((scores[0], scores[1]))
+        if move:
+            us = board.turn
+            ours, theirs = self.deltas(board, move)
+            scores[us] += ours
+            scores[not us] += theirs
+        # else a null move, nothing changes
+        board.push(move)
+
+    """
+    Changes of the scores of the side to move and of the other side that move would make,
+    without making it
+    """
+    def deltas(self, board: chess.Board, move: chess.Move):
+        values = self.values
+        us = board.turn
+        them = not us
+        offsets = self.offsets[us]
+        from_sq = move.from_square
+        to_sq = move.to_square
+        type = board.piece_type_at(from_sq)
+
+        if type == chess.KING and board.is_castling(move):
+            kingside = board.is_kingside_castling(move)
+            rank = chess.square_rank(from_sq)
+            # Chess960 castling is encoded as the king capturing its own rook
+            if board.occupied_co[us] & chess.BB_SQUARES[to_sq]:
+                rook_from = to_sq
+            else:
+                rook_from = chess.square(7 if kingside else 0, rank)
+            king_to = chess.square(6 if kingside else 2, rank)
+            rook_to = chess.square(5 if kingside else 3, rank)
+            king = offsets[chess.KING]
+            rook = offsets[chess.ROOK]
+            return values[king + king_to] - values[king + from_sq] + values[rook + rook_to] - values[rook + rook_from], 0
+
+        # Captured piece
+        theirs = 0
+        if board.is_en_passant(move):
+            theirs = -values[self.offsets[them][chess.PAWN] + (to_sq - 8 if us == chess.WHITE else to_sq + 8)]
+        else:
+            captured = board.piece_type_at(to_sq)
+            if captured is not None:
+                theirs = -values[self.offsets[them][captured] + to_sq]
+
+        # Moved (or promoted) piece
+        return values[offsets[move.promotion or type] + to_sq] - values[offsets[type] + from_sq], theirs
+
+    def pop(self, board: chess.Board):
+        board.pop()
+        self.scores[0], self.scores[1] = self.stack.pop()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+
+import chess
+
+# Plies tracked for killer moves
+MAX_PLY = 128
+
+# Sort keys, higher is searched first
+HASH_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 28
+KILLER_SCORES = (1 << 27, (1 << 27) - 1)
+
+"""
+Orders moves for alpha-beta search:
+  1. best move from the transposition table
+  2. captures and promotions by most valuable victim / least valuable attacker
+  3. the two killer moves of this ply (quiet moves that caused a cutoff in a sibling)
+  4. remaining quiet moves by history score (how often and how deep they caused a cutoff)
+"""
+class MoveOrdering():
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [0] * (64 * 64)
+
+    """
+    Called between moves so old history doesn't outweigh the current position
+    """
+    def age(self):
+        self.history = [h >> 1 for h in self.history]
+
+    """
+    Line the killers up with a root that is plies further into the game
+    """
+    def advance(self, plies):
+        if 0 < plies < MAX_PLY:
+            self.killers = self.killers[plies:] + [[None, None] for _ in range(plies)]
+
+    def order(self, board: chess.Board, moves, ply, hash_move=None):
+        killers = self.killers[ply] if ply < MAX_PLY else (None, None)
+        history = self.history
+        them = board.occupied_co[not board.turn]
+        keys = {}
+        for move in moves:
+            if move == hash_move:
+                keys[move] = HASH_SCORE
+            elif them & chess.BB_SQUARES[move.to_square] or move.promotion or board.is_en_passant(move):
+                keys[move] = CAPTURE_SCORE + capture_score(board, move)
+            elif move == killers[0]:
+                keys[move] = KILLER_SCORES[0]
+            elif move == killers[1]:
+                keys[move] = KILLER_SCORES[1]
+            else:
+                keys[move] = history[move.from_square * 64 + move.to_square]
+        return sorted(moves, key=keys.__getitem__, reverse=True)
+
+    """
+    The moves of order() generated in stages, so nodes cut off by an early move skip most of the work:
+      1. hash move  2. captures and promotions  3. killers  4. quiet moves
+    Each stage is generated pseudo-legally and sorted on its own, a move is checked for
+    legality only when it is yielded
+    """
+    def staged(self, board: chess.Board, ply, hash_move=None):
+        if board.is_check() or board.king(board.turn) is None:
+            # Evasions are generated legal directly, and there are few of them
+            yield from self.order(board, list(board.generate_legal_moves()), ply, hash_move)
+            return
+        legal = legality(board)
+
+        if hash_move is not None and board.is_pseudo_legal(hash_move) and legal(hash_move):
+            yield hash_move
+
+        us = board.turn
+        promoting = board.pawns & board.occupied_co[us] & (chess.BB_RANK_7 if us == chess.WHITE else chess.BB_RANK_2)
+        captures = list(board.generate_pseudo_legal_captures())
+        captures += board.generate_pseudo_legal_moves(promoting, ~board.occupied)
+        captures.sort(key=lambda move: capture_score(board, move), reverse=True)
+        for move in captures:
+            if move != hash_move and legal(move):
+                yield move
+
+        killers = self.killers[ply] if ply < MAX_PLY else (None, None)
+        searched = [hash_move]
+        for killer in killers:
+            if (killer is not None and killer not in searched and board.is_pseudo_legal(killer)
+                    and not killer.promotion and not board.is_capture(killer) and legal(killer)):
+                yield killer
+            searched.append(killer)
+
+        history = self.history
+        ep_square = board.ep_square
+        quiets = [move for move in board.generate_pseudo_legal_moves(chess.BB_ALL, ~board.occupied)
+                  if not move.promotion and move not in searched
+                  and not (move.to_square == ep_square and board.is_en_passant(move))]
+        # Castling is encoded as the king moving to its rook, which is masked out above
+        quiets += (move for move in board.generate_castling_moves() if move not in searched)
+        quiets.sort(key=lambda move: history[move.from_square * 64 + move.to_square], reverse=True)
+        for move in quiets:
+            if legal(move):
+                yield move
+
+    """
+    Record a move that caused a cutoff, captures are already ordered first so only quiets are kept
+    """
+    def cutoff(self, board: chess.Board, move, ply, depth):
+        if board.is_capture(move) or move.promotion:
+            return
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        self.history[move.from_square * 64 + move.to_square] += depth * depth
+
+"""
+MVV-LVA score of a capture / promotion
+"""
+def capture_score(board: chess.Board, move):
+    if board.is_en_passant(move):
+        victim = chess.PAWN
+    else:
+        victim = board.piece_type_at(move.to_square) or 0
+    attacker = board.piece_type_at(move.from_square)
+    return victim * 8 - attacker + (move.promotion or 0) * 8
+
+"""
+Pseudo-legal captures of a position ordered by MVV-LVA for quiescence search, check them with legality() before searching them
+"""
+def pseudo_legal_captures(board: chess.Board):
+    captures = list(board.generate_pseudo_legal_captures())
+    captures.sort(key=lambda move: capture_score(board, move), reverse=True)
+    return captures
+
+"""
+Function telling whether a pseudo-legal move of the position is legal.
+Out of check it only has to test for pins and king moves into attacks, which python-chess
+does with the private _slider_blockers / _is_safe its own legal move generator uses
+"""
+def legality(board: chess.Board):
+    king = board.king(board.turn)
+    if king is None or board.is_check():
+        return board.is_legal
+    blockers = board._slider_blockers(king)
+    return lambda move: board._is_safe(king, blockers, move)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+
+import os
+import random
+import chess
+import chess.polyglot
+
+"""
+Opening book of searched root positions stored in Polyglot .bin format.
+
+Each entry is a (zobrist key, move, weight, learn) record, sorted by key, so lookups in a
+saved book are a binary search over the memory-mapped file (chess.polyglot reads it too).
+weight counts how often the move was chosen in the position and learn holds the search
+score of the last time it was chosen (as a signed 32-bit value).
+Newly recorded moves are kept in memory until the book is saved.
+"""
+class OpeningBook():
+
+    def __init__(self, path=None):
+        self.path = path
+        self.reader = None
+        if path is not None and os.path.exists(path):
+            self.reader = chess.polyglot.open_reader(path)
+        # key -> {raw move: [weight, learn]}
+        self.recorded = {}
+
+    """
+    (move, weight, score) of every legal book move in a position
+    """
+    def entries(self, board: chess.Board):
+        key = chess.polyglot.zobrist_hash(board)
+        merged = {}
+        if self.reader is not None:
+            for entry in self.reader.find_all(key):
+                merged[entry.raw_move] = [entry.weight, entry.learn]
+        for raw_move, (weight, learn) in self.recorded.get(key, {}).items():
+            if raw_move in merged:
+                merged[raw_move][0] = min(0xFFFF, merged[raw_move][0] + weight)
+                merged[raw_move][1] = learn
+            else:
+                merged[raw_move] = [weight, learn]
+
+        entries = []
+        for raw_move, (weight, learn) in merged.items():
+            move = decode_move(board, raw_move)
+            if board.is_legal(move):
+                entries.append((move, weight, decode_score(learn)))
+        return entries
+
+    """
+    Book move of a position (None when out of book)
+    Picks the most played move, or a random move weighted by how often it was played
+    """
+    def choose(self, board: chess.Board, weighted_random=False, rng=random):
+        entries = self.entries(board)
+        if len(entries) == 0:
+            return None
+        if weighted_random:
+            return rng.choices([move for move, _, _ in entries], weights=[weight for _, weight, _ in entries])[0]
+        return max(entries, key=lambda entry: (entry[1], entry[2]))[0]
+
+    def record(self, board: chess.Board, move: chess.Move, score=0):
+        moves = self.recorded.setdefault(chess.polyglot.zobrist_hash(board), {})
+        raw_move = encode_move(board, move)
+        weight, _ = moves.get(raw_move, (0, 0))
+        moves[raw_move] = [min(0xFFFF, weight + 1), encode_score(score)]
+
+    """
+    Merge the recorded moves into the book file (path defaults to the file the book was opened from,
+    a new file starts as a copy of that one)
+    """
+    def save(self, path=None):
+        path = path or self.path
+        self.close()
+        merged = {}
+        # Read the file again, another book on the same path may have saved since this one opened it
+        source = path if os.path.exists(path) else self.path
+        if source is not None and os.path.exists(source):
+            with chess.polyglot.open_reader(source) as reader:
+                for entry in reader:
+                    merged[(entry.key, entry.raw_move)] = [entry.weight, entry.learn]
+        for key, moves in self.recorded.items():
+            for raw_move, (weight, learn) in moves.items():
+                current = merged.setdefault((key, raw_move), [0, learn])
+                current[0] = min(0xFFFF, current[0] + weight)
+                current[1] = learn
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            for (key, raw_move), (weight, learn) in sorted(merged.items()):
+                file.write(chess.polyglot.ENTRY_STRUCT.pack(key, raw_move, weight, learn))
+        os.replace(tmp_path, path)
+
+        self.path = path
+        self.recorded = {}
+        self.reader = chess.polyglot.open_reader(path)
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+    def __getstate__(self):
+        # Memory maps can't be sent to other processes, reopen the file there instead
+        state = self.__dict__.copy()
+        state["reader"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.path is not None and os.path.exists(self.path):
+            self.reader = chess.polyglot.open_reader(self.path)
+
+"""
+Polyglot move encoding: to | from << 6 | promotion << 12, castling as king takes rook
+"""
+def encode_move(board: chess.Board, move: chess.Move):
+    to_square = move.to_square
+    if board.is_castling(move) and not board.chess960:
+        rank = chess.square_rank(move.from_square)
+        to_square = chess.square(7 if board.is_kingside_castling(move) else 0, rank)
+    promotion = move.promotion - 1 if move.promotion else 0
+    return to_square | (move.from_square << 6) | (promotion << 12)
+
+def decode_move(board: chess.Board, raw_move):
+    to_square = raw_move & 0x3f
+    from_square = (raw_move >> 6) & 0x3f
+    promotion = (raw_move >> 12) & 0x7
+    return board._from_chess960(board.chess960, from_square, to_square, promotion + 1 if promotion else None)
+
+def encode_score(score):
+    return int(max(-2 ** 31, min(2 ** 31 - 1, score))) & 0xFFFFFFFF
+
+def decode_score(learn):
+    return learn - 2 ** 32 if learn >= 2 ** 31 else learn
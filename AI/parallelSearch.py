@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import atexit
+import multiprocessing as mp
+from collections import OrderedDict
+import chess
+from AI.transpositionTable import TranspositionTable
+from AI.searchStats import SearchStats
+
+INT_MIN = -sys.maxsize - 1
+INT_MAX = sys.maxsize
+
+"""
+Multi-process root move search shared by the table AIs.
+
+The first root move is searched in the calling process to get a good alpha bound,
+the remaining moves are then handed out one at a time to a pool of worker processes.
+Each worker searches on its own copy of the board and publishes any improvement of
+the best score through a shared value, so moves searched later are still cut off.
+The number of nodes searched is shared the same way so node budgets hold across workers.
+Tasks are tagged with a search id so leftovers of an aborted search can't touch a later one.
+"""
+
+"""
+Raised inside a search when the time or node budget of the move runs out
+"""
+class SearchTimeout(Exception):
+    pass
+
+# One pool (with its shared values) per worker count, reused between moves and AIs
+_pools = {}
+_pid = None
+# Set in processes that play games in parallel, so their searches don't start pools of their own
+_serial = False
+
+# Shared values of the pool this worker process belongs to
+_alpha = None
+_nodes = None
+_search = None
+
+# Transposition tables kept by this worker between moves, least recently used first
+_tables = OrderedDict()
+MAX_WORKER_TABLES = 2
+# Seconds between checks for stop() while waiting for the workers
+STOP_POLL = 0.05
+
+def _init_worker(alpha, nodes, search):
+    global _alpha, _nodes, _search
+    _alpha = alpha
+    _nodes = nodes
+    _search = search
+
+def _worker_table(ai):
+    table = _tables.pop(ai.tt_id, None)
+    if table is None:
+        table = TranspositionTable(ai.tt_size_mb)
+    _tables[ai.tt_id] = table
+    while len(_tables) > MAX_WORKER_TABLES:
+        _tables.popitem(last=False)
+    table.set_age(ai.searches)
+    return table
+
+"""
+The search a task of this worker process belongs to was aborted, checked by the AI as part of its budget
+"""
+def search_aborted(search_id):
+    return _search is not None and _search.value != search_id
+
+def _score_move(task):
+    ai, board, move_score, depth, beta, search_id = task
+    if search_aborted(search_id):
+        raise SearchTimeout()
+    ai.search_id = search_id
+    if ai.tt_size_mb > 0:
+        ai.tt = _worker_table(ai)
+    ai.nodes = start_nodes = _nodes.value
+    if ai.stats is not None:
+        # Only count this task, the caller adds it to its own stats
+        ai.stats = SearchStats()
+    try:
+        ai.score_move(board, move_score.move, move_score, depth, alpha=_alpha.value, beta=beta)
+    finally:
+        with _nodes.get_lock():
+            if _search.value == search_id:
+                _nodes.value += ai.nodes - start_nodes
+    with _alpha.get_lock():
+        if _search.value == search_id and move_score.score > _alpha.value:
+            _alpha.value = move_score.score
+    return move_score, ai.stats
+
+def get_pool(workers):
+    global _pid
+    if _pid != os.getpid():
+        # Forked from a process with pools of its own, whose handler threads don't exist here
+        _pools.clear()
+        _pid = os.getpid()
+    if workers not in _pools:
+        alpha = mp.Value('d', INT_MIN)
+        nodes = mp.Value('q', 0)
+        search = mp.Value('q', 0)
+        pool = mp.Pool(processes=workers, initializer=_init_worker, initargs=(alpha, nodes, search))
+        _pools[workers] = (pool, alpha, nodes, search)
+    return _pools[workers]
+
+@atexit.register
+def shutdown():
+    if _pid == os.getpid():
+        for pool, *_ in _pools.values():
+            pool.terminate()
+    _pools.clear()
+
+"""
+Search serially in this process whatever the AIs' threads setting, used as the initializer
+of processes that each play a game so N game processes don't each start a search pool
+"""
+def search_serially():
+    global _serial
+    _serial = True
+
+"""
+Score every move in move_scores (in place) to the given depth using ai.score_move,
+within the root window (alpha, beta)
+Uses worker processes when workers > 1 (unless search_serially() was called), otherwise searches serially
+Raises SearchTimeout if the budget of the AI runs out
+"""
+def score_moves(ai, board: chess.Board, move_scores: list, depth, workers=1, alpha=INT_MIN, beta=INT_MAX):
+    # Search the first move locally to establish an alpha bound
+    first = move_scores[0]
+    ai.score_move(board, first.move, first, depth, alpha=alpha, beta=beta, pv=True)
+    alpha = max(alpha, first.score)
+
+    if workers <= 1 or _serial or len(move_scores) == 1:
+        for move_score in move_scores[1:]:
+            ai.score_move(board, move_score.move, move_score, depth, alpha=alpha, beta=beta)
+            alpha = max(alpha, move_score.score)
+        return move_scores
+
+    pool, shared_alpha, shared_nodes, shared_search = get_pool(workers)
+    with shared_alpha.get_lock():
+        shared_search.value += 1
+        shared_alpha.value = alpha
+        shared_nodes.value = ai.nodes
+    search_id = shared_search.value
+    tasks = [(ai, board, move_score, depth, beta, search_id) for move_score in move_scores[1:]]
+    try:
+        results = []
+        pending = pool.imap_unordered(_score_move, tasks, chunksize=1)
+        while len(results) < len(tasks):
+            try:
+                results.append(pending.next(timeout=STOP_POLL))
+            except mp.TimeoutError:
+                pass
+            if ai.stopped:
+                # Stopped from another thread while waiting for the workers
+                raise SearchTimeout()
+    except SearchTimeout:
+        # Make the workers drop the remaining tasks
+        with shared_alpha.get_lock():
+            shared_search.value += 1
+        raise
+    finally:
+        ai.nodes = shared_nodes.value
+    if ai.stats is not None:
+        for _, stats in results:
+            ai.stats.merge(stats)
+    # Keep the original order so ties are still broken the same way
+    order = {ms.move: i for i, ms in enumerate(move_scores)}
+    results.sort(key=lambda result: order[result[0].move])
+    move_scores[1:] = [ms for ms, _ in results]
+    return move_scores
@@ -10,4 +10,16 @@ class PlayerAI(ABC):
   
     @abstractmethod
     def make_move(self, board): 
-        pass
\ No newline at end of file
+        pass
+
+    # Called before the start of each game, e.g. to clear search state
+    def new_game(self):
+        pass
+
+    # Called from another thread to make a running make_move return early, its move is discarded
+    def stop(self):
+        pass
+
+    # Called with the position after this player's move, to think while the opponent moves
+    def ponder(self, board):
+        pass
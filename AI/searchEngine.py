@@ -0,0 +1,657 @@
+#!/usr/bin/env python
+
+import sys
+from AI.playerAI import PlayerAI
+from AI.parallelSearch import score_moves, search_aborted, SearchTimeout
+from AI.transpositionTable import TranspositionTable, tt_key, EXACT, LOWER, UPPER
+from AI.moveOrdering import MoveOrdering, pseudo_legal_captures, legality
+from AI.incrementalEval import IncrementalEval
+from AI.batchEval import BatchEvaluator, bitboards
+from AI.searchStats import SearchStats
+import chess
+import random
+import uuid
+import time
+import threading
+
+INT_MIN = -sys.maxsize - 1
+INT_MAX = sys.maxsize
+
+# Score of being checkmated at the root, a mate n plies away scores MATE_SCORE - n
+MATE_SCORE = 1000000000
+# Scores beyond this are mates
+MATE_BOUND = MATE_SCORE - 1000
+
+# Depth searched to when only limited by time or nodes
+MAX_DEPTH = 64
+
+# Null move pruning: the null move is searched this much shallower, from this depth on
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_MIN_DEPTH = 2
+# Late move reductions: quiet moves after the first LMR_MIN_MOVES are searched a ply
+# shallower (two plies after LMR_LATE_MOVES) from LMR_MIN_DEPTH on
+LMR_MIN_DEPTH = 2
+LMR_MIN_MOVES = 3
+LMR_LATE_MOVES = 8
+# Half width of the first aspiration window around the previous iteration's score
+ASPIRATION_WINDOW = 100
+
+"""
+Iterative deepening negamax search shared by the table AIs.
+
+Scores are from the point of view of the side to move at each node. The evaluator only
+scores one color, the root player's (see IncrementalEval), so a leaf is worth that score
+when the root player is to move and minus it otherwise.
+
+Subclasses set self.eval_table (an EvalTable) and may override make_evaluator() to plug in
+another evaluator, any object with reset(board), push(board, move), pop(board),
+score(color) and deltas(board, move) (see IncrementalEval) that follows the board
+through push / pop, null moves included.
+
+On top of alpha-beta with a transposition table, move ordering and quiescence search
+the search can use, each switched on by its own constructor argument:
+- pvs: principal variation search, moves after the first are searched with a null window
+  and only re-searched when they beat the best move
+- aspiration: root windows around the previous iteration's score, opened up on a fail
+- null_move: pass and prune when a reduced search still fails high
+- lmr: late move reductions of quiet moves ordered late
+- futility: skip quiet moves one ply above the leaves and captures in quiescence search
+  whose evaluation gain can't reach alpha (the opponent could stand pat after them)
+"""
+class SearchEngine(PlayerAI):
+
+    # The evaluation changes when the endgame is entered (a separate endgame king table)
+    ENDGAME_TABLES = False
+
+    def __init__(self, depth=2, threads=8, tt_size_mb=16, time_limit=None, node_limit=None, quiescence=True,
+                 batch_eval=False, stats=False, pvs=True, aspiration=True, null_move=True, lmr=True, futility=True,
+                 ponder=False):
+        self.depth = depth
+        self.in_endgame = False
+        # Number of worker processes the root moves are split across (1 searches serially)
+        self.threads = threads
+        # Transposition table size in MB (0 disables it), allocated on the first move
+        self.tt_size_mb = tt_size_mb
+        self.tt = None
+        # Per move search budget in seconds / nodes, depth is ignored when either is set
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.nodes = 0
+        self.deadline = None
+        self.max_nodes = None
+        self.pv = []
+        self.best_score = 0
+        # Seconds since the start of the move at which each iteration completed
+        self.depth_times = []
+        # Extend leaves with a capture-only search
+        self.use_quiescence = quiescence
+        self.ordering = MoveOrdering()
+        # Score the children of depth 1 nodes with one NumPy product instead of move by move
+        self.batch_eval = batch_eval
+        self.batch = None
+        # Collect SearchStats of every move, those of the last move are in self.stats
+        self.collect_stats = stats
+        self.stats = None
+        self.root_ply = 0
+        self.root_color = chess.WHITE
+        # Set from another thread by stop() to abort the current search
+        self.stopped = False
+        # Root search of the worker process task this copy searches (see parallelSearch), None otherwise
+        self.search_id = None
+        self.use_pvs = pvs
+        self.use_aspiration = aspiration
+        self.use_null_move = null_move
+        self.use_lmr = lmr
+        self.use_futility = futility
+        # Search on the opponent's time, see ponder()
+        self.use_ponder = ponder
+        self.ponder_thread = None
+        # Ends pondering without touching stopped, so a stop() meant for the next move isn't lost
+        self.ponder_stopped = False
+        self.ponder_key = None
+        self.ponder_scores = None
+        self.root_scores = []
+        self.new_game()
+
+    def new_game(self):
+        self.stop_pondering()
+        self.searches = 0
+        self.ordering.clear()
+        self.reset_tt()
+
+    """
+    Forget all stored positions, workers notice the new tt_id and start a fresh table too
+    """
+    def reset_tt(self):
+        self.tt_id = uuid.uuid4().hex
+        if self.tt is not None:
+            self.tt.clear()
+
+    def make_move(self, board: chess.Board):
+        # Keep what was searched while pondering if the opponent played the expected reply
+        self.stopped = False
+        resume = self.stop_pondering(board)
+        return self.search(board, resume)
+
+    """
+    Iterative deepening search of a position, continued from the root move scores of an
+    earlier search of it (resume) if given. Without budget only stop() ends a search
+    that is limited by time or nodes.
+    """
+    def search(self, board: chess.Board, resume=None, budget=True, workers=None, rng=random):
+        in_endgame = self.is_endgame(board)
+        if self.tt_size_mb > 0:
+            if self.tt is None:
+                self.tt = TranspositionTable(self.tt_size_mb)
+            elif self.ENDGAME_TABLES and in_endgame != self.in_endgame:
+                # The king table changed so stored scores are stale
+                self.reset_tt()
+            self.searches += 1
+            self.tt.set_age(self.searches)
+        self.ordering.age()
+        # Killers are kept per ply from the root, which has moved on since the last search
+        self.ordering.advance(board.ply() - self.root_ply)
+        self.in_endgame = in_endgame
+        # Leaf scores are updated move by move from this position
+        self.evaluator = self.make_evaluator()
+        self.evaluator.reset(board)
+        if self.batch_eval:
+            self.batch = BatchEvaluator(self.eval_table, board.turn, self.in_endgame)
+        self.root_ply = board.ply()
+        self.root_color = board.turn
+        self.deadline = None
+        self.max_nodes = None
+        start = time.time()
+        max_depth = self.depth if self.time_limit is None and self.node_limit is None else MAX_DEPTH
+
+        if resume is None:
+            legal_moves = list(board.legal_moves)
+            rng.shuffle(legal_moves)
+            assert len(legal_moves) > 0
+            # Start with the move the last search expected to play here
+            expected = self.expected_move(board)
+            if expected in legal_moves:
+                legal_moves.remove(expected)
+                legal_moves.insert(0, expected)
+
+            # Construct list of class containing move and score so moves can be searched in parallel
+            scores = [MoveScore(move) for move in legal_moves]
+            start_depth = 0
+            best_move = None
+        else:
+            scores = resume
+            start_depth = self.completed_depth + 1
+            best_move = scores[0].move
+            if self.best_score >= MATE_BOUND:
+                start_depth = max_depth + 1
+        # Counters and budgets only cover this search, not the pondering it resumes
+        self.nodes = 0
+        self.depth_times = []
+        self.stats = SearchStats() if self.collect_stats else None
+        if budget and best_move is not None:
+            self.set_budget(start)
+
+        # Iterative deepening, the first iteration always completes
+        stack_len = len(board.move_stack)
+        for depth in range(start_depth, max_depth + 1):
+            try:
+                self.search_root(board, scores, depth, first_iteration=best_move is None,
+                                 workers=self.threads if workers is None else workers)
+            except SearchTimeout:
+                # Discard the unfinished iteration
+                while len(board.move_stack) > stack_len:
+                    board.pop()
+                break
+            # Search the best moves first in the next iteration (stable so ties stay shuffled)
+            scores.sort(key=lambda m_score: m_score.score, reverse=True)
+            best_move = scores[0].move
+            self.best_score = scores[0].score
+            self.completed_depth = depth
+            self.depth_times.append(time.time() - start)
+            if scores[0].score >= MATE_BOUND:
+                # Forced win found
+                break
+
+            if budget:
+                self.set_budget(start)
+            if self.out_of_budget():
+                break
+
+        if best_move is None:
+            # Stopped before the first iteration completed
+            return None
+        self.root_scores = scores
+        self.pv = self.get_pv(board, best_move)
+        if self.stats is not None:
+            self.stats.nodes = self.nodes
+            self.stats.depth = self.completed_depth
+            self.stats.depth_times = self.depth_times
+            self.stats.elapsed = time.time() - start
+        return best_move
+
+    def set_budget(self, start):
+        if self.time_limit is not None:
+            self.deadline = start + self.time_limit
+        if self.node_limit is not None:
+            self.max_nodes = self.node_limit
+
+    """
+    Move the last search expected to be played in this position, if the game followed its principal variation
+    """
+    def expected_move(self, board: chess.Board):
+        if len(self.pv) > 2 and board.move_stack[-2:] == self.pv[:2]:
+            return self.pv[2]
+        return None
+
+    """
+    Search the position after the expected reply to our last move in a background thread,
+    until the next make_move (or stop / new_game). Called with the position after our move.
+
+    Only with ponder=True, the search runs in this process so it takes turns with any other
+    search here, pondering pays off when the opponent searches elsewhere (worker processes,
+    an engine, a human). Which moves are played then depends on timing.
+    """
+    def ponder(self, board: chess.Board):
+        self.stop_pondering()
+        if not self.use_ponder or len(self.pv) < 2 or not board.move_stack or board.peek() != self.pv[0]:
+            return
+        board = board.copy()
+        if self.pv[1] not in board.legal_moves:
+            return
+        board.push(self.pv[1])
+        if board.is_game_over():
+            return
+        self.ponder_key = board.fen()
+        self.ponder_scores = None
+        self.stopped = False
+        self.ponder_stopped = False
+        self.ponder_thread = threading.Thread(target=self.ponder_search, args=(board,), daemon=True)
+        self.ponder_thread.start()
+
+    def ponder_search(self, board: chess.Board):
+        # Serial and with its own random order, so neither the worker pool nor the random
+        # state of the games played in this process are touched
+        if self.search(board, budget=False, workers=1, rng=random.Random(board.fen())) is not None:
+            self.ponder_scores = self.root_scores
+
+    """
+    Wait for pondering to stop, returns the root move scores to resume from if it searched board
+    """
+    def stop_pondering(self, board: chess.Board = None):
+        if self.ponder_thread is None:
+            return None
+        self.ponder_stopped = True
+        self.ponder_thread.join()
+        self.ponder_thread = None
+        self.ponder_stopped = False
+        if board is not None and self.ponder_scores is not None and board.fen() == self.ponder_key:
+            return self.ponder_scores
+        return None
+
+    """
+    Score the root moves to depth, within a window around the last iteration's best score
+    that is opened up on the side the best score falls outside of
+    """
+    def search_root(self, board: chess.Board, scores: list, depth, first_iteration=False, workers=1):
+        if not self.use_aspiration or first_iteration or abs(self.best_score) >= MATE_BOUND:
+            score_moves(self, board, scores, depth, workers=workers)
+            return
+        alpha, beta = self.best_score - ASPIRATION_WINDOW, self.best_score + ASPIRATION_WINDOW
+        while True:
+            score_moves(self, board, scores, depth, workers=workers, alpha=alpha, beta=beta)
+            best = max(move_score.score for move_score in scores)
+            if best <= alpha:
+                alpha = INT_MIN
+            elif best >= beta:
+                beta = INT_MAX
+            else:
+                return
+
+    """
+    Make a search or pondering running in another thread return as soon as possible
+    (make_move returns None if no move was searched yet)
+    """
+    def stop(self):
+        self.stopped = True
+        # Pondering only runs between moves, wait for it so nothing searches after a game ends
+        ponder_thread = self.ponder_thread
+        if ponder_thread is not None and ponder_thread is not threading.current_thread():
+            ponder_thread.join()
+
+    """
+    Check the time and node budget of the current move
+    """
+    def out_of_budget(self):
+        if self.stopped or self.ponder_stopped:
+            return True
+        if self.search_id is not None and search_aborted(self.search_id):
+            # Task of a worker process whose search was stopped or timed out in the caller
+            return True
+        if self.deadline is not None and time.time() >= self.deadline:
+            return True
+        return self.max_nodes is not None and self.nodes >= self.max_nodes
+
+    """
+    Principal variation starting with move, following best moves in the transposition table
+    """
+    def get_pv(self, board: chess.Board, move):
+        pv = [move]
+        if self.tt is None:
+            return pv
+        color = board.turn
+        board.push(move)
+        while len(pv) < MAX_DEPTH:
+            entry = self.tt.probe(tt_key(board, color))
+            if entry is None or entry[3] not in board.legal_moves:
+                break
+            pv.append(entry[3])
+            board.push(entry[3])
+        for _ in pv:
+            board.pop()
+        return pv
+
+    def __getstate__(self):
+        # The transposition table and pondering are not copied to other processes
+        state = self.__dict__.copy()
+        state["tt"] = None
+        state["ponder_thread"] = None
+        return state
+
+    """
+    Score of a root move from the root player's point of view, moves searched after the
+    first one (pv=False) only need to prove whether they beat alpha
+    """
+    def score_move(self, board, move, move_score, depth, alpha=INT_MIN, beta=INT_MAX, pv=False):
+        self.evaluator.push(board, move)
+        if self.use_pvs and not pv:
+            score = -self.negamax(board, depth, -alpha - 1, -alpha)
+            if alpha < score < beta:
+                score = -self.negamax(board, depth, -beta, -alpha)
+        else:
+            score = -self.negamax(board, depth, -beta, -alpha)
+        self.evaluator.pop(board)
+        move_score.score = score
+
+    def negamax(self, board: chess.Board, depth, alpha, beta, ply=1, null_move=True):
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and self.out_of_budget():
+            raise SearchTimeout()
+
+        # Reuse results of transposed / previously searched positions
+        alpha_orig = alpha
+        key = None
+        hash_move = None
+        if depth > 0 and self.tt is not None:
+            key = tt_key(board, self.root_color)
+            entry = self.tt.probe(key)
+            if entry is not None:
+                tt_depth, tt_score, bound, hash_move = entry
+                if tt_depth >= depth:
+                    tt_score = score_from_tt(tt_score, ply)
+                    if bound == EXACT:
+                        return tt_score
+                    elif bound == LOWER:
+                        alpha = max(alpha, tt_score)
+                    else:
+                        beta = min(beta, tt_score)
+                    if alpha >= beta:
+                        return tt_score
+
+        score = self.terminal_score(board, ply)
+        if score is not None:
+            return score
+
+        if depth <= 0:
+            if self.use_quiescence:
+                return self.quiescence(board, alpha, beta)
+            if self.stats is not None:
+                self.stats.leaf(ply)
+            return self.static_score(board)
+
+        in_check = board.is_check()
+
+        # Give the opponent a free move, if we are still above beta the position is good enough
+        if (self.use_null_move and null_move and depth >= NULL_MOVE_MIN_DEPTH and not in_check
+                and beta < MATE_BOUND and has_pieces(board) and self.static_score(board) >= beta):
+            self.evaluator.push(board, chess.Move.null())
+            score = -self.negamax(board, depth - 1 - NULL_MOVE_REDUCTION, -beta, -beta + 1, ply + 1, null_move=False)
+            self.evaluator.pop(board)
+            if score >= beta:
+                # Mates found after passing aren't proven
+                return beta if score >= MATE_BOUND else score
+
+        # Hash move, then captures, killers and quiets to get cutoffs early, generated stage by stage
+        moves = self.ordering.staged(board, ply, hash_move)
+
+        # Children of depth 1 nodes are evaluated together
+        leaves = None
+        if depth == 1 and self.batch is not None:
+            moves = list(moves)
+            leaves = self.batch_leaves(board, moves)
+
+        value = INT_MIN
+        best_move = None
+        # Above the leaves the opponent can stand pat after a quiet move, so it can't score more than its gain
+        static = self.static_score(board) if self.frontier(depth, alpha, in_check) else None
+        for i, move in enumerate(moves):
+            if static is not None and i > 0 and not (move.promotion or board.is_capture(move)):
+                bound = static + self.gain(board, move)
+                if bound <= alpha and not board.gives_check(move):
+                    value = max(value, bound)
+                    continue
+            if leaves is not None:
+                score = -self.leaf_score(board, move, leaves[i], -beta, -alpha)
+            elif i == 0 or not (self.use_pvs or self.use_lmr):
+                self.evaluator.push(board, move)
+                score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+                self.evaluator.pop(board)
+            else:
+                reduction = self.reduction(board, move, i, depth, in_check)
+                # Null window around alpha with PVS, else only reduced moves are searched twice
+                window = alpha + 1 if self.use_pvs else beta
+                self.evaluator.push(board, move)
+                score = -self.negamax(board, depth - 1 - reduction, -window, -alpha, ply + 1)
+                if reduction and score > alpha:
+                    score = -self.negamax(board, depth - 1, -window, -alpha, ply + 1)
+                if window != beta and alpha < score < beta:
+                    score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+                self.evaluator.pop(board)
+
+            if score > value:
+                value, best_move = score, move
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                self.ordering.cutoff(board, move, ply, depth)
+                if self.stats is not None:
+                    self.stats.cutoff(i)
+                break
+
+        if key is not None:
+            if value <= alpha_orig:
+                bound = UPPER
+            elif value >= beta:
+                bound = LOWER
+            else:
+                bound = EXACT
+            self.tt.store(key, depth, score_to_tt(value, ply), bound, best_move)
+
+        return value
+
+    """
+    Plies a move is searched shallower by late move reductions, moves that capture,
+    promote, give check or get out of check aren't reduced
+    """
+    def reduction(self, board: chess.Board, move, move_index, depth, in_check):
+        if not self.use_lmr or depth < LMR_MIN_DEPTH or move_index < LMR_MIN_MOVES or in_check:
+            return 0
+        if move.promotion or board.is_capture(move) or board.gives_check(move):
+            return 0
+        return 2 if move_index >= LMR_LATE_MOVES and depth > LMR_MIN_DEPTH else 1
+
+    """
+    Futility pruning applies to the quiet moves of a node, with quiescence search the node is
+    one ply above it
+    """
+    def frontier(self, depth, alpha, in_check):
+        return self.use_futility and self.use_quiescence and depth == 1 and not in_check and abs(alpha) < MATE_BOUND
+
+    """
+    How much a move changes the evaluation for the side to move
+    """
+    def gain(self, board: chess.Board, move):
+        ours, theirs = self.evaluator.deltas(board, move)
+        return ours if board.turn == self.root_color else -theirs
+
+    """
+    Evaluation from the point of view of the side to move
+    """
+    def static_score(self, board: chess.Board):
+        score = self.evaluator.score(self.root_color)
+        return score if board.turn == self.root_color else -score
+
+    """
+    Score of a finished game for the side to move, None if the game is not over
+    Mates closer to the root score higher
+    """
+    def terminal_score(self, board: chess.Board, ply):
+        outcome = board.outcome()
+        if outcome is None:
+            return None
+        if outcome.winner is None:
+            return 0
+        elif outcome.winner == board.turn:
+            return MATE_SCORE - ply
+        else:
+            return ply - MATE_SCORE
+
+    """
+    Static scores of all children of a depth 1 node from one batched evaluation
+    Returns (score for the side to move in the child, is the game over) per move
+    """
+    def batch_leaves(self, board: chess.Board, legal_moves):
+        leaves = [None] * len(legal_moves)
+        pending = []
+        positions = []
+        ply = board.ply() + 1 - self.root_ply
+        # The batch evaluator scores the root player
+        sign = 1 if board.turn != self.root_color else -1
+        for i, move in enumerate(legal_moves):
+            self.nodes += 1
+            if self.nodes & 1023 == 0 and self.out_of_budget():
+                raise SearchTimeout()
+            board.push(move)
+            score = self.terminal_score(board, ply)
+            if score is not None:
+                leaves[i] = (score, True)
+            else:
+                positions.append(bitboards(board))
+                if self.stats is not None:
+                    self.stats.leaf(ply)
+                pending.append(i)
+            board.pop()
+        for i, score in zip(pending, self.batch.evaluate(positions)):
+            leaves[i] = (sign * score, False)
+        return leaves
+
+    def leaf_score(self, board: chess.Board, move, leaf, alpha, beta):
+        score, game_over = leaf
+        if game_over or not self.use_quiescence:
+            return score
+        self.evaluator.push(board, move)
+        score = self.quiescence(board, alpha, beta, stand_pat=score)
+        self.evaluator.pop(board)
+        return score
+
+    """
+    Search captures only below the leaves so positions aren't evaluated in the middle of an exchange
+    """
+    def quiescence(self, board: chess.Board, alpha, beta, stand_pat=None):
+        # Stand pat, the side to move doesn't have to capture
+        if stand_pat is None:
+            value = self.static_score(board)
+            if self.stats is not None:
+                self.stats.leaf(board.ply() - self.root_ply)
+        else:
+            value = stand_pat
+        if value >= beta:
+            return value
+        alpha = max(alpha, value)
+
+        stand_pat = value
+        legal = None
+        for move in pseudo_legal_captures(board):
+            if self.use_futility:
+                # The opponent can stand pat after this capture, a capture that can't reach alpha is skipped
+                bound = stand_pat + self.gain(board, move)
+                if bound <= alpha:
+                    value = max(value, bound)
+                    continue
+            if legal is None:
+                legal = legality(board)
+            if not legal(move):
+                continue
+            self.nodes += 1
+            if self.nodes & 1023 == 0 and self.out_of_budget():
+                raise SearchTimeout()
+            self.evaluator.push(board, move)
+            score = -self.quiescence(board, -beta, -alpha)
+            self.evaluator.pop(board)
+            if score > value:
+                value = score
+                if value >= beta:
+                    break
+                alpha = max(alpha, value)
+
+        return value
+
+    """
+    Check if endgame is entered
+    """
+    def is_endgame(self, board: chess.Board):
+        return self.eval_table.is_endgame(board)
+
+    """
+    Evaluator of the current stage of the game, kept up to date during search
+    """
+    def make_evaluator(self):
+        return IncrementalEval(self.eval_table, self.in_endgame)
+
+    """
+    Return the centipawn piece value of a board for a given color
+    """
+    def material_value(self, color: chess.Color, board: chess.Board):
+        return self.eval_table.material_value(board, color)
+
+    """
+    Evaluate our position using material value and PSTs
+    """
+    def evaluate_pos(self, board: chess.Board, color: chess.Color):
+        return self.eval_table.evaluate(board, color, self.in_endgame)
+
+"""
+The side to move has a piece besides pawns and king, without one passing could be the
+best move (zugzwang) and null move pruning isn't safe
+"""
+def has_pieces(board: chess.Board):
+    return bool(board.occupied_co[board.turn] & ~(board.pawns | board.kings))
+
+# Mate scores are stored relative to the node so they stay right when reached at another ply
+def score_to_tt(score, ply):
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+def score_from_tt(score, ply):
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+class MoveScore():
+    def __init__(self, move):
+        self.move = move
+        self.score = INT_MIN
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+"""
+Counters of one move's search, filled in by the table AIs when created with stats=True.
+With stats off the AIs keep stats as None and only pay for an `is not None` check
+at leaves and cutoffs.
+
+nodes: positions visited (including quiescence)
+leaf_evals: static evaluations
+cutoffs: full-width nodes whose search was cut off, first_move_cutoffs: of which by the first move searched
+seldepth: deepest ply below the root reached (quiescence included)
+depth: last completed iteration, depth_times: seconds at which each iteration completed
+A move resumed from pondering only counts the iterations searched after the opponent moved.
+"""
+class SearchStats():
+
+    def __init__(self):
+        self.nodes = 0
+        self.leaf_evals = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.seldepth = 0
+        self.depth = 0
+        self.elapsed = 0
+        self.depth_times = []
+
+    def leaf(self, ply):
+        self.leaf_evals += 1
+        if ply > self.seldepth:
+            self.seldepth = ply
+
+    def cutoff(self, move_index):
+        self.cutoffs += 1
+        if move_index == 0:
+            self.first_move_cutoffs += 1
+
+    """
+    Add the counters of a search of the same move done elsewhere (e.g. in a worker process)
+    """
+    def merge(self, other):
+        self.leaf_evals += other.leaf_evals
+        self.cutoffs += other.cutoffs
+        self.first_move_cutoffs += other.first_move_cutoffs
+        self.seldepth = max(self.seldepth, other.seldepth)
+
+    def first_move_cutoff_ratio(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs > 0 else 0
+
+    def nps(self):
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0
+
+    """
+    Effective branching factor, that of a uniform tree as big and deep as the last iteration
+    (the root moves are searched to depth + 1 plies)
+    """
+    def branching_factor(self):
+        return self.nodes ** (1 / (self.depth + 1)) if self.nodes > 0 else 0
+
+    def as_dict(self):
+        return {
+            "nodes": self.nodes,
+            "leaf_evals": self.leaf_evals,
+            "cutoffs": self.cutoffs,
+            "first_move_cutoff_ratio": self.first_move_cutoff_ratio(),
+            "seldepth": self.seldepth,
+            "depth": self.depth,
+            "elapsed": self.elapsed,
+            "nps": self.nps(),
+            "branching_factor": self.branching_factor(),
+            "depth_times": self.depth_times,
+        }
+
+    def __str__(self):
+        return "depth {} seldepth {} nodes {} leaf evals {} cutoffs {} ({:.0%} first move) {:.2f}s {:.0f} nps".format(
+            self.depth, self.seldepth, self.nodes, self.leaf_evals, self.cutoffs,
+            self.first_move_cutoff_ratio(), self.elapsed, self.nps())
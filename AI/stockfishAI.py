@@ -1,29 +1,74 @@
 #!/usr/bin/env python
 
 from AI.playerAI import PlayerAI
+from AI.enginePool import AsyncEnginePool, engine_path, get_pool
 import chess
-from stockfish import Stockfish
-
-SF_PATH = "/opt/homebrew/bin/stockfish"
+import chess.engine
+import uuid
 
 """
-Runs local version of stockfish installed at SF_PATH
+Runs a local UCI engine, Stockfish by default (see engine_path for where it is looked for)
+Engine processes come from a shared pool and are leased for a whole game
+time_limit is in milliseconds
 """
 class StockfishAI(PlayerAI):
-    
-    def __init__(self, elo=1350, depth=15, threads=2, time_limit=10, sf_path=SF_PATH):
+
+    def __init__(self, elo=1350, depth=15, threads=2, time_limit=10, sf_path=None):
        self.name = "StockFish ({})".format(elo)
-       self.time_limit = time_limit
-       self.sf = Stockfish(sf_path, depth=depth, parameters={
-          "Threads": threads,
-       })
-       self.sf.set_elo_rating(elo)
-  
-    def make_move(self, board: chess.Board): 
-        # Generate FEN representation of board
-        fen = board.fen()
-        # Use StockFish to generate the best move
-        self.sf.set_fen_position(fen)
-        move = chess.Move.from_uci(self.sf.get_best_move_time(self.time_limit))
-        return move
-        
\ No newline at end of file
+       self.elo = elo
+       self.threads = threads
+       self.limit = chess.engine.Limit(time=time_limit / 1000, depth=depth)
+       self.command = engine_path(sf_path)
+       # Engine leased from the pool for the current game
+       self.engine = None
+       # Tells the engine when a new game starts (it sends ucinewgame)
+       self.game_id = uuid.uuid4().hex
+
+    def new_game(self):
+        self.release()
+        self.game_id = uuid.uuid4().hex
+
+    def make_move(self, board: chess.Board):
+        if self.engine is None:
+            self.engine = get_pool(self.command).lease()
+        result = self.engine.play(board, self.limit, game=self.game_id, options=self.engine_options(self.engine.options))
+        return result.move
+
+    """
+    make_move for asyncio code, leases an engine from pool for just this move
+    """
+    async def make_move_async(self, board: chess.Board, pool: AsyncEnginePool):
+        engine = await pool.lease()
+        try:
+            result = await engine.play(board, self.limit, game=self.game_id, options=self.engine_options(engine.options))
+        finally:
+            await pool.release(engine)
+        return result.move
+
+    """
+    Options for this player, clamped to what the engine supports
+    """
+    def engine_options(self, available):
+        options = {}
+        if "Threads" in available:
+            options["Threads"] = self.threads
+        if "UCI_Elo" in available:
+            elo = available["UCI_Elo"]
+            options["UCI_Elo"] = max(elo.min, min(elo.max, self.elo))
+            if "UCI_LimitStrength" in available:
+                options["UCI_LimitStrength"] = True
+        return options
+
+    """
+    Hand the engine back to the pool
+    """
+    def release(self):
+        if self.engine is not None:
+            get_pool(self.command).release(self.engine)
+            self.engine = None
+
+    def __getstate__(self):
+        # Engines belong to the process that started them
+        state = self.__dict__.copy()
+        state["engine"] = None
+        return state
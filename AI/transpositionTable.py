@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+import sys
+from array import array
+import chess
+import chess.polyglot
+
+INT_MIN = -sys.maxsize - 1
+INT_MAX = sys.maxsize
+
+# Bound types (0 marks an empty slot)
+EXACT = 1
+LOWER = 2
+UPPER = 3
+
+# Key of positions evaluated from black's point of view, the table evaluators
+# only score one side so the same position has a different score per color
+BLACK_KEY = 0x9D39247E33776D41
+
+"""
+Fixed size transposition table keyed by the polyglot zobrist hash of a position.
+Entries are kept in flat typed arrays so the memory used is set by size_mb alone.
+Each slot stores the key, score, bound type, search depth, best move and the age
+(search number) it was written in. A slot is replaced when it is empty, holds the same
+position, was written by an older search or was searched to a lower depth.
+"""
+class TranspositionTable():
+
+    # Bytes per slot: key (8), score (8), move (2), depth (1), bound (1), age (1)
+    ENTRY_SIZE = 21
+
+    def __init__(self, size_mb=16):
+        self.size_mb = size_mb
+        self.size = max(1, int(size_mb * 1024 * 1024) // self.ENTRY_SIZE)
+        self.age = 0
+        self.clear()
+
+    def clear(self):
+        self.keys = array('Q', bytes(8 * self.size))
+        self.scores = array('d', bytes(8 * self.size))
+        self.moves = array('H', bytes(2 * self.size))
+        self.depths = array('b', bytes(self.size))
+        self.bounds = array('B', bytes(self.size))
+        self.ages = array('B', bytes(self.size))
+
+    def set_age(self, age):
+        self.age = age & 0xFF
+
+    def probe(self, key):
+        i = key % self.size
+        if self.bounds[i] == 0 or self.keys[i] != key:
+            return None
+        return self.depths[i], decode_score(self.scores[i]), self.bounds[i], decode_move(self.moves[i])
+
+    def store(self, key, depth, score, bound, move=None):
+        i = key % self.size
+        if self.bounds[i] != 0 and self.ages[i] == self.age and depth < self.depths[i]:
+            # Keep the deeper result from this search
+            return
+        self.keys[i] = key
+        self.scores[i] = encode_score(score)
+        self.moves[i] = encode_move(move)
+        self.depths[i] = depth
+        self.bounds[i] = bound
+        self.ages[i] = self.age
+
+"""
+Key of a position as evaluated by the given color
+"""
+def tt_key(board: chess.Board, color: chess.Color):
+    key = chess.polyglot.zobrist_hash(board)
+    return key if color == chess.WHITE else key ^ BLACK_KEY
+
+# Mate scores are +-sys.maxsize which a double can't hold exactly
+def encode_score(score):
+    if score >= INT_MAX:
+        return float("inf")
+    if score <= INT_MIN:
+        return float("-inf")
+    return score
+
+def decode_score(score):
+    if score == float("inf"):
+        return INT_MAX
+    if score == float("-inf"):
+        return INT_MIN
+    return score
+
+def encode_move(move):
+    if move is None:
+        return 0
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+def decode_move(code):
+    if code == 0:
+        return None
+    return chess.Move(code & 63, (code >> 6) & 63, (code >> 12) or None)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+import chess
+from AI.evalTable import EvalTable
+from AI.singleTableAI import EVAL_TABLE
+
+RESIGNATION = "resignation"
+QUIET_DRAW = "quiet draw"
+LOW_MATERIAL = "low material"
+
+"""
+Ends games whose result is already clear, judged by an evaluator both players agree on
+(the PST.py table by default, so neither player's own evaluation decides its games).
+
+- resignation: one side is ahead by at least resign_margin for resign_plies plies in a row
+- quiet draw: from draw_min_ply on the evaluation stays within draw_margin for draw_plies plies in a row
+- low material: no pawns are left and neither side has more than a knight or a bishop besides its king,
+  so neither can force mate
+
+check() is called after every ply and returns (result, reason) once a rule applies.
+"""
+class Adjudicator():
+
+    def __init__(self, evaluator: EvalTable = EVAL_TABLE, resign_margin=1000, resign_plies=8,
+                 draw_margin=30, draw_plies=40, draw_min_ply=80):
+        self.evaluator = evaluator
+        self.resign_margin = resign_margin
+        self.resign_plies = resign_plies
+        self.draw_margin = draw_margin
+        self.draw_plies = draw_plies
+        self.draw_min_ply = draw_min_ply
+        self.reset()
+
+    def reset(self):
+        # Consecutive plies white / black has been winning and the evaluation has been level
+        self.winning = [0, 0]
+        self.level = 0
+
+    """
+    Evaluation from white's point of view
+    """
+    def evaluate(self, board: chess.Board):
+        endgame = self.evaluator.is_endgame(board)
+        return self.evaluator.evaluate(board, chess.WHITE, endgame) - self.evaluator.evaluate(board, chess.BLACK, endgame)
+
+    def check(self, board: chess.Board):
+        if not board.pawns and all(self.cannot_win(board, color) for color in chess.COLORS):
+            return 0.5, LOW_MATERIAL
+
+        score = self.evaluate(board)
+        for color, sign in ((chess.WHITE, 1), (chess.BLACK, -1)):
+            self.winning[color] = self.winning[color] + 1 if score * sign >= self.resign_margin else 0
+            if self.winning[color] >= self.resign_plies:
+                return color, RESIGNATION
+
+        self.level = self.level + 1 if abs(score) <= self.draw_margin and board.ply() >= self.draw_min_ply else 0
+        if self.level >= self.draw_plies:
+            return 0.5, QUIET_DRAW
+        return None
+
+    """
+    Nothing but the king and at most one minor piece, judged by piece type as evolved
+    piece values can rate a rook below a bishop
+    """
+    def cannot_win(self, board: chess.Board, color: chess.Color):
+        pieces = board.occupied_co[color] & ~board.kings
+        return pieces & ~(board.knights | board.bishops) == 0 and chess.popcount(pieces) <= 1
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import chess
+import numpy as np
+
+from AI.singleTableAI import SingleTableAI
+from AI.evoTableAI import EvoTableAI, random_genomes
+from evolution import load_pickle
+
+BASELINE_FILE = "benchmark_baseline.json"
+SEED = 0
+
+# id, EPD, perft counts from depth 1 (published values for the first five)
+SUITE = [
+    ("startpos", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -", [20, 400, 8902, 197281]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq -", [48, 2039, 97862]),
+    ("endgame", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - -", [14, 191, 2812, 43238]),
+    ("promotions", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq -", [6, 264, 9467]),
+    ("middlegame", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ -", [44, 1486, 62379]),
+    ("italian", "r1bq1rk1/pppp1ppp/2n2n2/2b1p3/2B1P3/2NP1N2/PPP2PPP/R1BQ1RK1 w - -", [37, 1183, 42968]),
+    ("queens_gambit", "rnbqkb1r/ppp2ppp/4pn2/3p4/2PP4/2N5/PP2PPPP/R1BQKBNR w KQkq -", [33, 1029, 34685]),
+    ("rook_endgame", "8/8/4k3/8/2R5/4K3/5P2/6r1 w - -", [23, 448, 8553]),
+]
+
+"""
+Search speed benchmark of the search based AIs over a fixed position suite.
+
+Every AI searches every position to a fixed depth on a single thread with the random
+module seeded, so node counts are reproducible and only the timings vary between runs.
+Move generation is measured with perft, whose node counts are checked against known values.
+Results are written as JSON and compared with a stored baseline: the run fails when the
+total NPS of an AI or of perft drops, or the nodes of a position grow, by more than the
+tolerance, or a perft count is wrong. NPS is only compared over the whole suite as single
+positions search too quickly for stable timings.
+"""
+
+"""
+[(id, board, perft counts)] from an EPD file (perft counts are read from D1..Dn operations)
+or the built in suite
+"""
+def load_suite(path=None):
+    if path is None:
+        return [(name, chess.Board.from_epd(epd)[0], counts) for name, epd, counts in SUITE]
+    suite = []
+    with open(path) as file:
+        for i, line in enumerate(file):
+            if not line.strip():
+                continue
+            board, ops = chess.Board.from_epd(line)
+            counts = []
+            while "D{}".format(len(counts) + 1) in ops:
+                counts.append(int(ops["D{}".format(len(counts) + 1)]))
+            suite.append((ops.get("id", "position_{}".format(i)), board, counts))
+    return suite
+
+def perft(board: chess.Board, depth):
+    if depth == 1:
+        return board.legal_moves.count()
+    nodes = 0
+    for move in board.legal_moves:
+        board.push(move)
+        nodes += perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+def bench_perft(suite, depth):
+    results = {}
+    for name, board, counts in suite:
+        d = min(depth, len(counts)) if counts else depth
+        start = time.perf_counter()
+        nodes = perft(board.copy(), d)
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "depth": d,
+            "nodes": nodes,
+            "time": elapsed,
+            "nps": nodes / elapsed if elapsed > 0 else 0,
+            "correct": counts[d - 1] == nodes if counts else None,
+        }
+    return results
+
+def bench_search(ai, suite):
+    results = {}
+    total_nodes = 0
+    total_time = 0
+    for name, board, _ in suite:
+        random.seed(SEED)
+        ai.new_game()
+        board = board.copy()
+        start = time.perf_counter()
+        move = ai.make_move(board)
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "move": move.uci(),
+            "nodes": ai.nodes,
+            "time": elapsed,
+            "nps": ai.nodes / elapsed if elapsed > 0 else 0,
+            "time_to_depth": ai.depth_times,
+        }
+        total_nodes += ai.nodes
+        total_time += elapsed
+    results["total"] = {
+        "nodes": total_nodes,
+        "time": total_time,
+        "nps": total_nodes / total_time if total_time > 0 else 0,
+    }
+    return results
+
+"""
+The AIs to benchmark, the evolved AI is loaded from model_file (or generated from a fixed seed without one)
+"""
+def search_players(depth, model_file="best_model"):
+    if os.path.exists(model_file):
+        evo = load_pickle(model_file)
+    else:
+        genomes, strat_params = random_genomes(1, np.random.default_rng(SEED))
+        evo = EvoTableAI(genome=genomes[0], strat_params=strat_params[0])
+    evo.depth = depth
+    evo.threads = 1
+    evo.time_limit = None
+    evo.node_limit = None
+    return {
+        "SingleTableAI": SingleTableAI(depth=depth, threads=1),
+        "EvoTableAI": evo,
+    }
+
+def run(depth=3, perft_depth=3, suite_path=None, model_file="best_model"):
+    suite = load_suite(suite_path)
+    results = {
+        "depth": depth,
+        "perft_depth": perft_depth,
+        "perft": bench_perft(suite, perft_depth),
+        "search": {},
+    }
+    for name, ai in search_players(depth, model_file).items():
+        results["search"][name] = bench_search(ai, suite)
+    return results
+
+def perft_nps(results):
+    return sum(r["nodes"] for r in results.values()) / sum(r["time"] for r in results.values())
+
+"""
+List of regressions of results against baseline
+"""
+def compare(results, baseline, tolerance=0.1):
+    regressions = []
+    for name, result in results["perft"].items():
+        if result["correct"] is False:
+            regressions.append("perft {} depth {}: {} nodes is wrong".format(name, result["depth"], result["nodes"]))
+    if baseline.get("depth") != results["depth"]:
+        regressions.append("baseline was searched to depth {}, rerun with --save-baseline".format(baseline.get("depth")))
+        return regressions
+
+    for player, positions in results["search"].items():
+        base_positions = baseline.get("search", {}).get(player, {})
+        for name, result in positions.items():
+            base = base_positions.get(name)
+            if base is not None and result["nodes"] > base["nodes"] * (1 + tolerance):
+                regressions.append("{} {}: {} nodes, baseline {}".format(player, name, result["nodes"], base["nodes"]))
+        base = base_positions.get("total")
+        if base is not None and positions["total"]["nps"] < base["nps"] * (1 - tolerance):
+            regressions.append("{}: {:.0f} NPS, baseline {:.0f}".format(player, positions["total"]["nps"], base["nps"]))
+
+    base = baseline.get("perft", {})
+    if base.keys() == results["perft"].keys() and baseline.get("perft_depth") == results["perft_depth"]:
+        nps = perft_nps(results["perft"])
+        if nps < perft_nps(base) * (1 - tolerance):
+            regressions.append("perft: {:.0f} NPS, baseline {:.0f}".format(nps, perft_nps(base)))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark search and move generation speed")
+    parser.add_argument("--depth", type=int, default=3, help="search depth")
+    parser.add_argument("--perft-depth", type=int, default=3, help="perft depth (capped by the known counts)")
+    parser.add_argument("--suite", help="EPD file of positions, D1..Dn operations give perft counts")
+    parser.add_argument("--model", default="best_model", help="pickled EvoTableAI to benchmark")
+    parser.add_argument("--output", help="write the results JSON here instead of stdout")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative slowdown")
+    args = parser.parse_args()
+
+    results = run(args.depth, args.perft_depth, args.suite, args.model)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print("Saved baseline to", args.baseline, file=sys.stderr)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        if regressions:
+            print("REGRESSIONS:", file=sys.stderr)
+            for regression in regressions:
+                print("  " + regression, file=sys.stderr)
+            sys.exit(1)
+        print("No regressions against", args.baseline, file=sys.stderr)
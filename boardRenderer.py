@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+import io
+import tkinter as tk
+from PIL import Image, ImageTk
+import chess
+import chess.svg
+import cairosvg
+
+LASTMOVE_COLOR = "#cdd16a"
+SELECTED_COLOR = "#6a9fd1"
+
+# Rasterised images per (board size, piece symbol or "board"), shared by all renderers
+_sprites = {}
+
+def _rasterise(svg, size):
+    png_data = cairosvg.svg2png(bytestring=svg.encode(), output_width=size, output_height=size)
+    return Image.open(io.BytesIO(png_data))
+
+"""
+Board background and the 12 piece images for a board size, rasterised on first use
+"""
+def sprites(board_size, master=None):
+    square_size = board_size // 8
+    if (board_size, "board") not in _sprites:
+        empty = chess.svg.board(board=chess.Board(None), coordinates=False, size=board_size)
+        _sprites[(board_size, "board")] = ImageTk.PhotoImage(_rasterise(empty, board_size), master=master)
+        for color in chess.COLORS:
+            for piece_type in chess.PIECE_TYPES:
+                piece = chess.Piece(piece_type, color)
+                svg = chess.svg.piece(piece, size=square_size)
+                _sprites[(board_size, piece.symbol())] = ImageTk.PhotoImage(_rasterise(svg, square_size), master=master)
+    return _sprites
+
+"""
+Draws a board on a persistent Canvas from cached sprites.
+
+Every square has a highlight rectangle and a piece image item that are created once,
+draw() only reconfigures the items of squares whose piece or highlight changed.
+"""
+class BoardRenderer:
+
+    def __init__(self, master, board_size=400):
+        self.board_size = board_size
+        self.square_size = board_size // 8
+        self.canvas = tk.Canvas(master, width=board_size, height=board_size, highlightthickness=0)
+        self.sprites = sprites(board_size, master)
+        self.canvas.create_image(0, 0, image=self.sprites[(board_size, "board")], anchor=tk.NW)
+
+        self.highlight_items = []
+        self.piece_items = []
+        for square in chess.SQUARES:
+            x, y = self.square_origin(square)
+            # Stippled to let the square show through, Tk on macOS fills them solid instead
+            self.highlight_items.append(self.canvas.create_rectangle(
+                x, y, x + self.square_size, y + self.square_size, width=0, stipple="gray50", state=tk.HIDDEN))
+            self.piece_items.append(self.canvas.create_image(x, y, anchor=tk.NW))
+
+        # What is currently shown on each square
+        self.pieces = {}
+        self.highlights = {}
+
+    """
+    Top left corner of a square in canvas coordinates (white at the bottom)
+    """
+    def square_origin(self, square):
+        return chess.square_file(square) * self.square_size, (7 - chess.square_rank(square)) * self.square_size
+
+    def square_at(self, x, y):
+        return chess.square(x // self.square_size, 7 - y // self.square_size)
+
+    def draw(self, board: chess.Board, lastmove=None, squares=None):
+        pieces = board.piece_map()
+        for square in set(pieces) | set(self.pieces):
+            piece = pieces.get(square)
+            if piece != self.pieces.get(square):
+                image = self.sprites[(self.board_size, piece.symbol())] if piece is not None else ""
+                self.canvas.itemconfigure(self.piece_items[square], image=image)
+        self.pieces = pieces
+
+        highlights = {}
+        if lastmove is not None:
+            highlights[lastmove.from_square] = LASTMOVE_COLOR
+            highlights[lastmove.to_square] = LASTMOVE_COLOR
+        for square in squares or []:
+            highlights[square] = SELECTED_COLOR
+        for square in set(highlights) | set(self.highlights):
+            color = highlights.get(square)
+            if color != self.highlights.get(square):
+                if color is None:
+                    self.canvas.itemconfigure(self.highlight_items[square], state=tk.HIDDEN)
+                else:
+                    self.canvas.itemconfigure(self.highlight_items[square], fill=color, state=tk.NORMAL)
+        self.highlights = highlights
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+import os
+import json
+import struct
+import numpy as np
+
+MAGIC = b"EVOCHKPT"
+VERSION = 1
+
+# magic, version, generation, population size, parameters per genome, seed, rng state length
+HEADER = struct.Struct("<8sIIIIQI")
+HEADER_SIZE = 64
+
+"""
+Evolution checkpoint holding a whole evaluated generation.
+
+Binary layout (little endian):
+  64 byte header: magic "EVOCHKPT", format version, generation, population size P,
+                  parameters per genome N, run seed, length of the RNG state
+  genomes          float32 (P, N)
+  strategy params  float32 (P, N)
+  fitness          float64 (P,)
+  RNG state        UTF-8 JSON of the random module and NumPy generator states
+
+The arrays sit at fixed offsets so they can be memory-mapped and inspected
+without loading (or unpickling) anything else.
+"""
+class Checkpoint():
+
+    def __init__(self, generation, genomes, strat_params, fitness, seed=0, rng_state=None):
+        self.generation = generation
+        self.genomes = genomes
+        self.strat_params = strat_params
+        self.fitness = fitness
+        self.seed = seed
+        self.rng_state = rng_state
+
+    def save(self, path):
+        genomes = np.ascontiguousarray(self.genomes, dtype="<f4")
+        strat_params = np.ascontiguousarray(self.strat_params, dtype="<f4")
+        fitness = np.ascontiguousarray(self.fitness, dtype="<f8")
+        rng_state = json.dumps(self.rng_state).encode()
+        size, num_params = genomes.shape
+
+        # Write to a temporary file first so a crash never leaves a half written checkpoint
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            header = HEADER.pack(MAGIC, VERSION, self.generation, size, num_params, self.seed, len(rng_state))
+            file.write(header.ljust(HEADER_SIZE, b"\0"))
+            file.write(genomes.tobytes())
+            file.write(strat_params.tobytes())
+            file.write(fitness.tobytes())
+            file.write(rng_state)
+        os.replace(tmp_path, path)
+
+    """
+    Read a checkpoint, with mmap the arrays are read-only views of the file
+    """
+    @staticmethod
+    def load(path, mmap=False):
+        with open(path, "rb") as file:
+            header = file.read(HEADER_SIZE)
+        magic, version, generation, size, num_params, seed, rng_len = HEADER.unpack(header[:HEADER.size])
+        if magic != MAGIC:
+            raise ValueError("{} is not an evolution checkpoint".format(path))
+        if version != VERSION:
+            raise ValueError("Unsupported checkpoint version {}".format(version))
+
+        offset = HEADER_SIZE
+        arrays = []
+        for dtype, shape in (("<f4", (size, num_params)), ("<f4", (size, num_params)), ("<f8", (size,))):
+            if mmap:
+                arrays.append(np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape))
+            else:
+                arrays.append(np.fromfile(path, dtype=dtype, count=int(np.prod(shape)), offset=offset).reshape(shape))
+            offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+
+        with open(path, "rb") as file:
+            file.seek(offset)
+            rng_state = json.loads(file.read(rng_len).decode())
+
+        genomes, strat_params, fitness = arrays
+        return Checkpoint(generation, genomes, strat_params, fitness, seed, rng_state)
+
+def checkpoint_path(directory, generation):
+    return os.path.join(directory, "gen_{:04d}.evo".format(generation))
+
+"""
+Paths of all checkpoints in a directory, oldest generation first
+"""
+def list_checkpoints(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".evo"))
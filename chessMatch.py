@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 import chess
+import random
 from AI.playerAI import PlayerAI
 
 from AI.greedyAI import GreedyAI
@@ -8,10 +9,19 @@ from AI.randomAI import RandomAI
   
 class ChessMatch(): 
   
-    def __init__(self, white: PlayerAI, black: PlayerAI):
+    def __init__(self, white: PlayerAI, black: PlayerAI, recorder=None, seed=0, adjudicator=None):
         self.white_player = white
         self.black_player = black
         self.board = chess.Board()
+        # SearchStats of every move played (None for players without stats)
+        self.move_stats = []
+        # GameWriter (see gameRecord.py) the finished game is written to, with its seed
+        self.recorder = recorder
+        self.seed = seed
+        # Adjudicator (see adjudication.py) that may end decided games early
+        self.adjudicator = adjudicator
+        # Why the game ended, e.g. "checkmate", "move limit" or "resignation"
+        self.termination = None
 
     def get_player(self):
         return self.white_player if self.board.turn == chess.WHITE else self.black_player
@@ -19,16 +29,25 @@ class ChessMatch():
     def play(self, move_limit=None, debug=False):
         if debug:
           print(self.white_player.name, "vs", self.black_player.name)
+        self.white_player.new_game()
+        self.black_player.new_game()
+        if self.adjudicator is not None:
+            self.adjudicator.reset()
         plys = 0
         moves = 0
+        result = None
         while not self.board.is_game_over():
-            move = self.get_player().make_move(self.board)
+            player = self.get_player()
+            move = player.make_move(self.board)
+            self.move_stats.append(getattr(player, "stats", None))
 
             if move not in self.board.legal_moves:
                 if debug:
-                    print("Illegal Move by", self.get_player().name, move)
+                    print("Illegal Move by", player.name, move)
                 # Gift the other player the win
-                return 1 - self.board.turn
+                result = 1 - self.board.turn
+                self.termination = "illegal move"
+                break
 
             self.board.push(move)
             plys += 1
@@ -36,16 +55,54 @@ class ChessMatch():
             if move_limit != None and moves >= move_limit:
                 if debug:
                   print("Move Limit Reached")
-                return 0.5
+                result = 0.5
+                self.termination = "move limit"
+                break
+
+            if self.adjudicator is not None and not self.board.is_game_over():
+                adjudication = self.adjudicator.check(self.board)
+                if adjudication is not None:
+                    result, self.termination = adjudication
+                    if debug:
+                        print("Adjudicated", self.termination)
+                    break
+
+            if not self.board.is_game_over():
+                # Think on the opponent's time (players created with ponder=True)
+                player.ponder(self.board)
+
+        # End any pondering left running
+        self.white_player.stop()
+        self.black_player.stop()
         
-        # Game is finished
-        if debug:
-            print("Outcome", self.board.outcome().result())
-        winner = self.board.outcome().winner
-        return winner if winner != None else 0.5
+        if result is None:
+            # Game is finished
+            if debug:
+                print("Outcome", self.board.outcome().result())
+            winner = self.board.outcome().winner
+            result = winner if winner != None else 0.5
+            self.termination = self.board.outcome().termination.name.lower().replace("_", " ")
+
+        if self.recorder is not None:
+            self.recorder.write(self.board, self.white_player.name, self.black_player.name, result, self.seed,
+                                self.termination)
+        return result
+
+"""
+Play one game with its own seed, used both in this process and in worker processes
+"""
+def play_game(white: PlayerAI, black: PlayerAI, seed, move_limit=None, debug=False, recorder=None, adjudicator=None):
+    # Don't disturb the random state of the caller when playing in this process
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        match = ChessMatch(white, black, recorder=recorder, seed=seed, adjudicator=adjudicator)
+        return match.play(move_limit=move_limit, debug=debug)
+    finally:
+        random.setstate(state)
 
 if __name__ == "__main__":
     greedy = GreedyAI()
-    random = RandomAI()
-    match = ChessMatch(greedy, random)
+    random_ai = RandomAI()
+    match = ChessMatch(greedy, random_ai)
     match.play(debug=True)
@@ -1,84 +1,168 @@
 #!/usr/bin/env python
 
-import chess
-from AI.evoTableAI import EvoTableAI
-from chessMatch import ChessMatch
+import os
+from AI.evoTableAI import EvoTableAI, random_genomes, mutate_population
+from chessMatch import play_game
+from tournament import Tournament, ScheduledGame, K_RANDOM
+from checkpoint import Checkpoint, checkpoint_path
+from gameRecord import GameWriter
+from prescreen import Prescreen
+from adjudication import Adjudicator
 import random
 import pickle
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 class Evolution():
   
-    def __init__(self, population_size=10):
+    def __init__(self, population_size=10, workers=1, seed=None, depth=2, tt_size_mb=4, move_limit=None,
+                 tournament=K_RANDOM, rounds=2, record_dir=None, prescreen=None,
+                 adjudicate=False):
         self.pop_size = population_size
+        # Fitness tournament (see tournament.py), rounds is used by k_random and swiss
+        self.tournament = tournament
+        self.rounds = rounds
+        # Processes games are played on (1 plays them in this process)
+        self.workers = workers
+        # Seed of the whole run, games get their own seeds drawn from it
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.depth = depth
+        self.tt_size_mb = tt_size_mb
+        self.move_limit = move_limit
+        # Directory every fitness game is recorded to (see gameRecord.py)
+        self.recorder = GameWriter(record_dir) if record_dir is not None else None
+        # Fraction of offspring that play games after scoring them on a position suite (None: all play)
+        self.prescreen = prescreen
+        # End decided games early (see adjudication.py)
+        self.adjudicator = Adjudicator() if adjudicate else None
+        self.surrogate = None
 
-    def run(self, generations=5):
-        # Initialise population
-        population = self.init_population(self.pop_size)
-        for gen in range(generations):
-            # Randomly vary individuals
-            population = self.generate_offspring(population)
-            # Evaluate fitness
-            fitness = []
-            for player in population:
-                fitness.append(self.fitness(player, [p for p in population if p != player]))
-            print(fitness)
-            # Select new generation
-            if gen < generations - 1:
-                population = self.get_best(zip(fitness, population), size=self.pop_size)
-                print("Generation", gen, "complete")
+    """
+    Evolve until `generations` generations have been evaluated and return the best player
+    With checkpoint_dir every evaluated generation is saved there, resume_from continues from a checkpoint
+    on_generation(generation, population, fitness) is called after each generation is evaluated and
+    returns the (population, fitness) to continue with, e.g. with migrants from other islands
+    """
+    def run(self, generations=5, checkpoint_dir=None, resume_from=None, on_generation=None):
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            if resume_from is not None:
+                population, fitness, start = self.load_checkpoint(resume_from)
             else:
-                # Return best
-                return self.get_best(zip(fitness, population), size=1)[0]
+                random.seed(self.seed)
+                self.rng = np.random.default_rng(self.seed)
+                # Initialise population
+                population, fitness, start = self.init_population(self.pop_size), None, 0
+
+            for gen in range(start, generations):
+                # Select new generation
+                if fitness is not None:
+                    population = self.get_best(zip(fitness, population), size=self.pop_size)
+                # Randomly vary individuals
+                population = self.generate_offspring(population)
+                population = self.screen_offspring(population)
+                # Evaluate fitness
+                fitness = self.fitness(population, executor)
+                print(fitness)
+                if on_generation is not None:
+                    population, fitness = on_generation(gen, population, fitness)
+                if checkpoint_dir is not None:
+                    self.save_checkpoint(checkpoint_path(checkpoint_dir, gen), gen, population, fitness)
+                print("Generation", gen, "complete")
+
+            # Return best
+            return self.get_best(zip(fitness, population), size=1)[0]
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    def save_checkpoint(self, path, generation, population: list[EvoTableAI], fitness):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        rng_state = {"random": random.getstate(), "numpy": self.rng.bit_generator.state}
+        Checkpoint(generation, np.stack([p.genome for p in population]), np.stack([p.strat_params for p in population]),
+                   fitness, self.seed, rng_state).save(path)
+
+    """
+    Restore the population, fitness and random state of a checkpoint
+    Returns (population, fitness, next generation)
+    """
+    def load_checkpoint(self, path):
+        checkpoint = Checkpoint.load(path)
+        self.seed = checkpoint.seed
+        version, state, gauss_next = checkpoint.rng_state["random"]
+        random.setstate((version, tuple(state), gauss_next))
+        self.rng = np.random.default_rng()
+        self.rng.bit_generator.state = checkpoint.rng_state["numpy"]
+        population = [self.new_player(genome, strat) for genome, strat in zip(checkpoint.genomes, checkpoint.strat_params)]
+        return population, checkpoint.fitness.tolist(), checkpoint.generation + 1
 
     def init_population(self, size):
-        return [EvoTableAI() for _ in range(size)]
+        genomes, strat_params = random_genomes(size, self.rng)
+        return [self.new_player(genome, strat) for genome, strat in zip(genomes, strat_params)]
+
+    def new_player(self, genome, strat_params):
+        # Games are already played in parallel so each player searches on a single process
+        return EvoTableAI(depth=self.depth, threads=1, tt_size_mb=self.tt_size_mb,
+                          genome=genome, strat_params=strat_params)
     
     def generate_offspring(self, parents: list[EvoTableAI]):
-        children = [p.gen_offspring() for p in parents]
+        # Mutate the whole population as one (P x NUM_PARAMS) matrix
+        genomes = np.stack([p.genome for p in parents])
+        strat_params = np.stack([p.strat_params for p in parents])
+        child_genomes, child_strat_params = mutate_population(genomes, strat_params, self.rng)
+        children = [p.with_genome(genome, strat) for p, genome, strat in zip(parents, child_genomes, child_strat_params)]
         return parents + children
 
-    # Play games against population and give score
-    def fitness(self, player: EvoTableAI, opponents: list[EvoTableAI]):
-        score = 0
-        # Play half as White
-        for _ in range(1):
-            opponent = random.choice(opponents)
-            match = ChessMatch(player, opponent)
-            outcome = match.play(debug=True)
-
-            if outcome == chess.WHITE:
-                score += 1
-            elif outcome == chess.BLACK:
-                score += 0
-            else:
-                score += 0.5
-    
-        # Play half as Black
-        for _ in range(1):
-            opponent = random.choice(opponents)
-            match = ChessMatch(player, opponent)
-            outcome = match.play(debug=True)
-            
-            if outcome == chess.BLACK:
-                score += 1
-            elif outcome == chess.WHITE:
-                score += 0
-            else:
-                score += 0.5
-        
-        return score
+    """
+    Drop the offspring with the worst surrogate fitness (see prescreen.py), parents are always kept
+    """
+    def screen_offspring(self, population: list[EvoTableAI]):
+        if self.prescreen is None:
+            return population
+        if self.surrogate is None:
+            self.surrogate = Prescreen()
+        parents, children = population[:len(population) // 2], population[len(population) // 2:]
+        scores = self.surrogate.score([child.eval_table for child in children])
+        keep = max(1, round(self.prescreen * len(children)))
+        best = sorted(np.argsort(-scores, kind="stable")[:keep])
+        return parents + [children[i] for i in best]
+
+    # Play a tournament between the population and give each player its points per game
+    def fitness(self, population: list[EvoTableAI], executor=None):
+        # Pairings and seeds are drawn up front so they don't depend on the number of workers
+        tournament = Tournament(len(population), mode=self.tournament, rounds=self.rounds, rng=random)
+        for batch in tournament.batches():
+            for game, outcome in self.play_games(population, batch, executor):
+                tournament.record(game, outcome)
+        return tournament.fitness()
+
+    """
+    Play a batch of scheduled games, yielding (game, outcome) as games complete
+    """
+    def play_games(self, population: list[EvoTableAI], games: list[ScheduledGame], executor=None):
+        if executor is None:
+            for game in games:
+                yield game, play_game(population[game.white], population[game.black], game.seed, self.move_limit, debug=True,
+                                      recorder=self.recorder, adjudicator=self.adjudicator)
+            return
+
+        futures = {executor.submit(play_game, population[game.white], population[game.black], game.seed,
+                                   self.move_limit, debug=True, recorder=self.recorder,
+                                   adjudicator=self.adjudicator): game for game in games}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
     
     def get_best(self, population: list[tuple[int, EvoTableAI]], size):
         return [player for _, player in 
-                sorted(population, key=lambda tup: tup[0])[:size]]
+                sorted(population, key=lambda tup: tup[0], reverse=True)[:size]]
 
-def save_pickle(model: EvoTableAI):
-    with open('best_model', 'wb') as file:
-        pickle.dump(model, file)
+def save_pickle(model: EvoTableAI, file='best_model'):
+    with open(file, 'wb') as f:
+        pickle.dump(model, f)
 
-def load_pickle(file) -> EvoTableAI:
-    with open('best_model', 'rb') as file:
-        return pickle.load(file)
+def load_pickle(file='best_model') -> EvoTableAI:
+    with open(file, 'rb') as f:
+        return pickle.load(f)
 
 if __name__ == "__main__":
     print("Loading model")
@@ -86,7 +170,7 @@ if __name__ == "__main__":
     if isinstance(model, EvoTableAI):
         print("Piece Values", model.MATERIAL_VAL)
 
-    evoluter = Evolution(population_size=2)
+    evoluter = Evolution(population_size=2, workers=os.cpu_count())
     print("Running Evolution")
     best = evoluter.run(generations=1)
     print("Evolution Complete")
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+
+import io
+import os
+import glob
+import uuid
+import struct
+import chess
+import chess.pgn
+from multiprocessing import util
+
+# record length, seed, result, plies, white name length, black name length, termination length,
+# FEN length (0 for the start position)
+RECORD_HEADER = struct.Struct("<IQBHBBBH")
+OFFSET = struct.Struct("<Q")
+
+RESULTS = ["0-1", "1-0", "1/2-1/2", "*"]
+BLACK_WINS, WHITE_WINS, DRAW, UNFINISHED = range(4)
+
+"""
+Append-only game records written by ChessMatch.
+
+Every process writes its own files (games_<pid>_<id>.bin / .idx / .pgn) so parallel
+workers never wait for each other. The .bin file holds one record per game:
+
+  header   RECORD_HEADER (see above), the length counts the whole record
+  names    UTF-8 white and black player names
+  reason   UTF-8 termination (why the game ended, see ChessMatch.termination)
+  FEN      start position when it isn't the standard one
+  moves    uint16 per ply: from | to << 6 | promotion piece type << 12
+
+and the .idx file the offset of every record in the .bin file. The .pgn file gets the
+same games as PGN with the seed in a Seed tag and the reason in a Termination tag. Writes are buffered and flushed every
+flush_every games and when the process exits.
+"""
+class GameWriter():
+
+    def __init__(self, directory, pgn=True, flush_every=64):
+        self.directory = directory
+        self.pgn = pgn
+        self.flush_every = flush_every
+
+    def write(self, board: chess.Board, white, black, outcome, seed=0, termination=None):
+        _files(self).write(board, white, black, outcome, seed, termination)
+
+    def close(self):
+        files = _open_files.pop(self.directory, None)
+        if files is not None and files.pid == os.getpid():
+            files.close()
+
+class _Files():
+
+    def __init__(self, writer: GameWriter):
+        os.makedirs(writer.directory, exist_ok=True)
+        self.pid = os.getpid()
+        self.flush_every = writer.flush_every
+        name = os.path.join(writer.directory, "games_{}_{}".format(self.pid, uuid.uuid4().hex[:8]))
+        # Unbuffered files with buffers of our own: a forked child that drops its copy of
+        # this object must not write out the parent's pending data when the files close
+        self.bin = open(name + ".bin", "ab", buffering=0)
+        self.idx = open(name + ".idx", "ab", buffering=0)
+        self.pgn = open(name + ".pgn", "ab", buffering=0) if writer.pgn else None
+        self.bin_buffer = bytearray()
+        self.idx_buffer = bytearray()
+        self.pgn_buffer = bytearray()
+        self.offset = self.bin.seek(0, os.SEEK_END)
+        self.unflushed = 0
+
+    def write(self, board: chess.Board, white, black, outcome, seed, termination):
+        record = encode_record(board, white, black, outcome, seed, termination)
+        self.idx_buffer += OFFSET.pack(self.offset)
+        self.bin_buffer += record
+        self.offset += len(record)
+        if self.pgn is not None:
+            game = chess.pgn.Game.from_board(board)
+            game.headers["White"] = white
+            game.headers["Black"] = black
+            game.headers["Result"] = RESULTS[result_code(outcome)]
+            game.headers["Seed"] = str(seed)
+            if termination:
+                game.headers["Termination"] = termination
+            self.pgn_buffer += (str(game) + "\n\n").encode()
+        self.unflushed += 1
+        if self.unflushed >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        # Records before index entries so the index never points past the data
+        for file, buffer in ((self.bin, self.bin_buffer), (self.idx, self.idx_buffer), (self.pgn, self.pgn_buffer)):
+            if file is not None and buffer:
+                file.write(buffer)
+                buffer.clear()
+        self.unflushed = 0
+
+    def close(self):
+        if self.bin.closed:
+            return
+        self.flush()
+        self.bin.close()
+        self.idx.close()
+        if self.pgn is not None:
+            self.pgn.close()
+
+# Open files of this process per directory, writers are pickled to worker processes without them
+_open_files = {}
+
+def _files(writer: GameWriter):
+    files = _open_files.get(writer.directory)
+    if files is None or files.pid != os.getpid():
+        files = _Files(writer)
+        _open_files[writer.directory] = files
+        # Runs at exit in this process, including pool workers where atexit handlers don't
+        util.Finalize(None, files.close, exitpriority=10)
+    return files
+
+def result_code(outcome):
+    if outcome is None:
+        return UNFINISHED
+    if outcome == 0.5:
+        return DRAW
+    return WHITE_WINS if outcome == chess.WHITE else BLACK_WINS
+
+def encode_move(move: chess.Move):
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+def decode_move(raw_move):
+    promotion = raw_move >> 12
+    return chess.Move(raw_move & 0x3f, (raw_move >> 6) & 0x3f, promotion if promotion else None)
+
+def encode_record(board: chess.Board, white, black, outcome, seed, termination=None):
+    white = white.encode()[:255]
+    black = black.encode()[:255]
+    termination = (termination or "").encode()[:255]
+    root = board.root()
+    fen = b"" if root.fen() == chess.STARTING_FEN else root.fen().encode()
+    moves = struct.pack("<{}H".format(len(board.move_stack)), *(encode_move(move) for move in board.move_stack))
+    length = RECORD_HEADER.size + len(white) + len(black) + len(termination) + len(fen) + len(moves)
+    header = RECORD_HEADER.pack(length, seed & 0xFFFFFFFFFFFFFFFF, result_code(outcome), len(board.move_stack),
+                                len(white), len(black), len(termination), len(fen))
+    return header + white + black + termination + fen + moves
+
+"""
+A game read back from a .bin file, the board is only replayed when asked for
+"""
+class GameRecord():
+
+    def __init__(self, white, black, result, seed, moves, fen=None, termination=None):
+        self.white = white
+        self.black = black
+        self.result = result
+        self.seed = seed
+        self.moves = moves
+        self.fen = fen
+        self.termination = termination
+
+    def board(self):
+        board = chess.Board(self.fen) if self.fen else chess.Board()
+        for move in self.moves:
+            board.push(move)
+        return board
+
+    def pgn(self):
+        game = chess.pgn.Game.from_board(self.board())
+        game.headers["White"] = self.white
+        game.headers["Black"] = self.black
+        game.headers["Result"] = self.result
+        game.headers["Seed"] = str(self.seed)
+        if self.termination:
+            game.headers["Termination"] = self.termination
+        return game
+
+def decode_record(header, body):
+    _, seed, result, plies, white_len, black_len, termination_len, fen_len = header
+    white = body[:white_len].decode()
+    black = body[white_len:white_len + black_len].decode()
+    start = white_len + black_len
+    termination = body[start:start + termination_len].decode() or None
+    start += termination_len
+    fen = body[start:start + fen_len].decode() or None
+    start += fen_len
+    moves = [decode_move(raw_move) for raw_move in struct.unpack_from("<{}H".format(plies), body, start)]
+    return GameRecord(white, black, RESULTS[result], seed, moves, fen, termination)
+
+"""
+Reads the games of every .bin file in a directory. Iterating streams the files record by record
+so any number of games can be read in constant memory, len() and indexing use the .idx files.
+"""
+class GameReader():
+
+    def __init__(self, directory):
+        self.paths = sorted(glob.glob(os.path.join(directory, "*.bin")))
+        self.counts = [os.path.getsize(path[:-4] + ".idx") // OFFSET.size if os.path.exists(path[:-4] + ".idx") else 0
+                       for path in self.paths]
+
+    def __iter__(self):
+        for path in self.paths:
+            yield from read_games(path)
+
+    def __len__(self):
+        return sum(self.counts)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        for path, count in zip(self.paths, self.counts):
+            if i < count:
+                with open(path[:-4] + ".idx", "rb") as idx:
+                    idx.seek(i * OFFSET.size)
+                    offset, = OFFSET.unpack(idx.read(OFFSET.size))
+                with open(path, "rb") as file:
+                    file.seek(offset)
+                    return read_record(file)
+            i -= count
+        raise IndexError("game index out of range")
+
+def read_record(file: io.BufferedReader):
+    data = file.read(RECORD_HEADER.size)
+    if len(data) < RECORD_HEADER.size:
+        return None
+    header = RECORD_HEADER.unpack(data)
+    body = file.read(header[0] - RECORD_HEADER.size)
+    if len(body) < header[0] - RECORD_HEADER.size:
+        # Cut off by a crash while writing
+        return None
+    return decode_record(header, body)
+
+def read_games(path):
+    with open(path, "rb", buffering=1 << 16) as file:
+        while True:
+            game = read_record(file)
+            if game is None:
+                return
+            yield game
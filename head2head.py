@@ -1,8 +1,14 @@
 #!/usr/bin/env python
 
+import math
+import random
 import chess
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from AI.playerAI import PlayerAI
-from chessMatch import ChessMatch
+from chessMatch import ChessMatch, play_game
+from gameRecord import GameWriter
+from adjudication import Adjudicator
+from AI.parallelSearch import search_serially
 
 from AI.greedyAI import GreedyAI
 from AI.randomAI import RandomAI
@@ -10,49 +16,204 @@ from AI.defensiveAI import DefensiveAI
 from AI.stockfishAI import StockfishAI
 from AI.singleTableAI import SingleTableAI
 
-class Head2Head(): 
-  
-    def __init__(self, player1: PlayerAI, player2: PlayerAI):
+H0 = "H0"
+H1 = "H1"
+
+"""
+Results of a match from player1's point of view
+"""
+class MatchResult():
+
+    def __init__(self, player1, player2, elo0=None, elo1=None, alpha=0.05, beta=0.05):
         self.player1 = player1
         self.player2 = player2
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        # SPRT hypotheses (Elo of player1 relative to player2) and error rates
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.lower_bound = math.log(beta / (1 - alpha))
+        self.upper_bound = math.log((1 - beta) / alpha)
+        # H0 / H1 once the test accepts a hypothesis, None while undecided
+        self.accepted = None
+
+    @property
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    def add(self, outcome):
+        if outcome == 1:
+            self.wins += 1
+        elif outcome == 0:
+            self.losses += 1
+        else:
+            self.draws += 1
+        if self.elo0 is not None and self.accepted is None:
+            llr = self.llr()
+            if llr >= self.upper_bound:
+                self.accepted = H1
+            elif llr <= self.lower_bound:
+                self.accepted = H0
+
+    def score(self):
+        return (self.wins + self.draws / 2) / self.games if self.games > 0 else 0.5
+
+    """
+    Per game variance of the score. Results that haven't happened count as half a game each,
+    so a clean sweep or a run of draws still has a spread and the SPRT can decide.
+    """
+    def variance(self):
+        wins, draws, losses = (max(count, 0.5) for count in (self.wins, self.draws, self.losses))
+        games = wins + draws + losses
+        s = (wins + draws / 2) / games
+        return (wins * (1 - s) ** 2 + draws * (0.5 - s) ** 2 + losses * s ** 2) / games
+
+    """
+    Elo difference estimate with its 95% confidence interval as (elo, lower, upper)
+    """
+    def elo(self):
+        if self.games == 0:
+            return 0, -math.inf, math.inf
+        s = self.score()
+        margin = 1.96 * math.sqrt(self.variance() / self.games)
+        return score_to_elo(s), score_to_elo(s - margin), score_to_elo(s + margin)
+
+    """
+    Log likelihood ratio of H1 (elo1) against H0 (elo0), normal approximation of the GSPRT
+    """
+    def llr(self):
+        if self.games == 0:
+            return 0
+        variance = self.variance()
+        s0 = elo_to_score(self.elo0)
+        s1 = elo_to_score(self.elo1)
+        return self.games * (s1 - s0) * (2 * self.score() - s0 - s1) / (2 * variance)
+
+    def __str__(self):
+        elo, lower, upper = self.elo()
+        text = "{} vs {}: +{} ={} -{} ({} games) Elo {:.1f} [{:.1f}, {:.1f}]".format(
+            self.player1, self.player2, self.wins, self.draws, self.losses, self.games, elo, lower, upper)
+        if self.elo0 is not None:
+            text += " LLR {:.2f} ({:.2f}, {:.2f})".format(self.llr(), self.lower_bound, self.upper_bound)
+            if self.accepted is not None:
+                text += " {} accepted".format(self.accepted)
+        return text
+
+def elo_to_score(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+def score_to_elo(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+class Head2Head():
+
+    def __init__(self, player1: PlayerAI, player2: PlayerAI, record_dir=None, adjudicate=False):
+        self.player1 = player1
+        self.player2 = player2
+        # Directory every game is recorded to (see gameRecord.py)
+        self.recorder = GameWriter(record_dir) if record_dir is not None else None
+        # End decided games early (see adjudication.py)
+        self.adjudicator = Adjudicator() if adjudicate else None
 
     def evaluate(self, iterations=100):
         # From player1 POV
-        wins = 0
-        draws = 0
-        losses = 0
-        
+        result = MatchResult(self.player1.name, self.player2.name)
+
         white = self.player1
         black = self.player2
         for color in chess.COLORS:
           for _ in range(iterations // 2):
-              match = ChessMatch(white, black)
+              match = ChessMatch(white, black, recorder=self.recorder, adjudicator=self.adjudicator)
               winner = match.play()
               if winner == 0.5:
-                  draws += 1
+                  result.add(0.5)
               elif winner == color:
-                  wins += 1
+                  result.add(1)
               else:
-                  losses += 1
-          
+                  result.add(0)
+
           # Switch black and white
           white = self.player2
           black = self.player1
 
-        actual_iterations = (iterations // 2) * 2
-        win_pc = (wins / actual_iterations) * 100
-        loss_pc = (losses / actual_iterations) * 100
-        draw_pc = (draws / actual_iterations) * 100
+        win_pc = (result.wins / result.games) * 100
+        loss_pc = (result.losses / result.games) * 100
+        draw_pc = (result.draws / result.games) * 100
 
         print(self.player1.name, "win", "{:.1f}%".format(win_pc))
         print(self.player2.name, "win", "{:.1f}%".format(loss_pc))
         print("draws", "{:.1f}%".format(draw_pc))
+        return result
+
+    """
+    Play games in parallel until a sequential probability ratio test accepts
+    H0: player1 is elo0 stronger than player2, or H1: player1 is elo1 stronger, or max_games are played.
+    Colours alternate every game and each game gets a seed drawn from seed.
+    on_result is called with the MatchResult after every finished game.
+    With workers > 1 each game process searches serially, whatever the players' threads setting.
+    """
+    def sprt(self, elo0=0, elo1=10, alpha=0.05, beta=0.05, max_games=1000, workers=1,
+             move_limit=None, seed=None, on_result=print):
+        result = MatchResult(self.player1.name, self.player2.name, elo0, elo1, alpha, beta)
+        rng = random.Random(seed)
+
+        def games():
+            for i in range(max_games):
+                # player1 plays white in even games
+                white, black = (self.player1, self.player2) if i % 2 == 0 else (self.player2, self.player1)
+                yield i % 2 == 0, white, black, rng.getrandbits(64)
+
+        if workers <= 1:
+            for player1_white, white, black, game_seed in games():
+                outcome = play_game(white, black, game_seed, move_limit, recorder=self.recorder, adjudicator=self.adjudicator)
+                result.add(player1_score(outcome, player1_white))
+                if on_result is not None:
+                    on_result(result)
+                if result.accepted is not None:
+                    break
+            return result
+
+        # Games run in parallel, so players search serially whatever their threads setting
+        with ProcessPoolExecutor(max_workers=workers, initializer=search_serially) as executor:
+            planned = games()
+            pending = {}
+            # Keep every worker busy with a few queued games
+            for player1_white, white, black, game_seed in planned:
+                pending[self.submit(executor, white, black, game_seed, move_limit)] = player1_white
+                if len(pending) >= 2 * workers:
+                    break
+            while pending and result.accepted is None:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result.add(player1_score(future.result(), pending.pop(future)))
+                    if on_result is not None:
+                        on_result(result)
+                    if result.accepted is not None:
+                        break
+                    game = next(planned, None)
+                    if game is not None:
+                        player1_white, white, black, game_seed = game
+                        pending[self.submit(executor, white, black, game_seed, move_limit)] = player1_white
+            for future in pending:
+                future.cancel()
+        return result
+
+    def submit(self, executor, white, black, seed, move_limit):
+        return executor.submit(play_game, white, black, seed, move_limit, recorder=self.recorder,
+                               adjudicator=self.adjudicator)
+
+def player1_score(outcome, player1_white):
+    if outcome == 0.5:
+        return 0.5
+    return 1 if (outcome == chess.WHITE) == player1_white else 0
 
 if __name__ == "__main__":
     greedy = GreedyAI()
     defensive = DefensiveAI()
     stockfish = StockfishAI(elo=50)
     single_table = SingleTableAI(depth=2)
-    random = RandomAI()
+    random_ai = RandomAI()
     h2h = Head2Head(single_table, stockfish)
-    h2h.evaluate(iterations=10)
\ No newline at end of file
+    h2h.evaluate(iterations=10)
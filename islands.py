@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+
+import sys
+import time
+import queue
+import random
+import argparse
+import threading
+import traceback
+import multiprocessing as mp
+from multiprocessing.connection import Listener, Client
+import numpy as np
+from evolution import Evolution, save_pickle
+from AI.evoTableAI import EvoTableAI
+
+RING = "ring"
+FULLY_CONNECTED = "fully_connected"
+
+AUTHKEY = b"evoChess"
+BASE_PORT = 6200
+# Seconds to keep retrying to reach a neighbour / to wait for migrants
+CONNECT_TIMEOUT = 60
+MIGRATION_TIMEOUT = 3600
+# Seconds between checks that the islands of IslandModel.run are still alive
+POLL_INTERVAL = 1
+
+"""
+Island model evolution.
+
+Every island runs its own Evolution loop (with its own seed and game workers) in a separate
+process, on this machine or another one. Every `interval` generations each island sends
+copies of its `migrants` best genomes, with their strategy parameters and fitness, to the
+islands it points to in the topology and replaces its worst players with the ones it receives.
+Migration is synchronous so a run is reproducible from its seed, and a message is a few kB
+(2 float32 arrays of 389 values per migrant).
+
+Islands talk over multiprocessing.connection sockets, island i listens on addresses[i].
+"""
+class IslandModel():
+
+    def __init__(self, num_islands=4, topology=RING, interval=2, migrants=2, seed=None,
+                 addresses=None, authkey=AUTHKEY, **evolution_args):
+        if topology not in (RING, FULLY_CONNECTED):
+            raise ValueError("Unknown topology {}".format(topology))
+        self.num_islands = num_islands
+        self.topology = topology
+        self.interval = interval
+        self.migrants = migrants
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.addresses = addresses or [("localhost", BASE_PORT + i) for i in range(num_islands)]
+        self.authkey = authkey
+        # Passed on to the Evolution of every island (population_size is per island)
+        self.evolution_args = evolution_args
+
+    def island_seed(self, index):
+        return random.Random(self.seed + index).getrandbits(32)
+
+    """
+    Run every island in a process of this machine and return the best player of all islands
+    """
+    def run(self, generations=5):
+        results = mp.Queue()
+        processes = [mp.Process(target=_run_island, args=(self, index, generations, results))
+                     for index in range(self.num_islands)]
+        for process in processes:
+            process.start()
+        best = {}
+        try:
+            while len(best) < len(processes):
+                try:
+                    index, result, error = results.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    # An island that died without reporting never will
+                    for index, process in enumerate(processes):
+                        if index not in best and process.exitcode not in (None, 0):
+                            raise RuntimeError("Island {} exited with code {}".format(index, process.exitcode))
+                    continue
+                if error is not None:
+                    raise RuntimeError("Island {} failed:\n{}".format(index, error))
+                best[index] = result
+        finally:
+            for process in processes:
+                if len(best) < len(processes) and process.is_alive():
+                    # The other islands would wait for its migrants in vain
+                    process.terminate()
+                process.join()
+        fitness, genome, strat_params = max(best.values(), key=lambda result: result[0])
+        return EvoTableAI(**self.player_args(), genome=genome, strat_params=strat_params)
+
+    def player_args(self):
+        return {"depth": self.evolution_args.get("depth", 2)}
+
+    """
+    Run one island in this process (e.g. one per machine) and return its best (fitness, genome, strat_params)
+    """
+    def run_island(self, index, generations=5):
+        island = Island(self, index)
+        try:
+            evolution = Evolution(seed=self.island_seed(index), **self.evolution_args)
+            evolution.run(generations, on_generation=lambda gen, population, fitness:
+                          island.migrate(gen, generations, population, fitness))
+            return island.best
+        finally:
+            island.close()
+
+    """
+    Islands that island index sends its migrants to
+    """
+    def targets(self, index):
+        if self.num_islands == 1:
+            return []
+        if self.topology == RING:
+            return [(index + 1) % self.num_islands]
+        return [i for i in range(self.num_islands) if i != index]
+
+    def sources(self, index):
+        return [i for i in range(self.num_islands) if index in self.targets(i)]
+
+def _run_island(model: IslandModel, index, generations, results):
+    try:
+        results.put((index, model.run_island(index, generations), None))
+    except Exception:
+        results.put((index, None, traceback.format_exc()))
+
+"""
+Migration endpoint of one island, a background thread receives migrants from the other islands
+"""
+class Island():
+
+    def __init__(self, model: IslandModel, index):
+        self.model = model
+        self.index = index
+        self.best = None
+        self.inbox = queue.Queue()
+        # Migrants that arrived before this island reached their generation
+        self.early = []
+        self.listener = Listener(tuple(model.addresses[index]), authkey=model.authkey)
+        threading.Thread(target=self.receive, daemon=True).start()
+
+    def receive(self):
+        while True:
+            try:
+                with self.listener.accept() as connection:
+                    self.inbox.put(connection.recv())
+            except (EOFError, mp.AuthenticationError):
+                # Dropped or unauthorised connection
+                continue
+            except OSError:
+                # Listener closed
+                return
+
+    def send(self, target, message):
+        deadline = time.time() + CONNECT_TIMEOUT
+        while True:
+            try:
+                with Client(tuple(self.model.addresses[target]), authkey=self.model.authkey) as connection:
+                    connection.send(message)
+                return
+            except ConnectionRefusedError:
+                # Not listening yet
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.1)
+
+    """
+    Called by Evolution.run after every generation: exchanges migrants every `interval` generations
+    """
+    def migrate(self, gen, generations, population: list, fitness: list):
+        order = np.argsort(fitness, kind="stable")[::-1]
+        self.best = (fitness[order[0]], population[order[0]].genome, population[order[0]].strat_params)
+        if (gen + 1) % self.model.interval != 0 or gen == generations - 1:
+            return population, fitness
+
+        best = order[:self.model.migrants]
+        message = (gen, self.index, np.stack([population[i].genome for i in best]),
+                   np.stack([population[i].strat_params for i in best]), [fitness[i] for i in best])
+        for target in self.model.targets(self.index):
+            self.send(target, message)
+
+        # Replace the worst players with the migrants, in order of the islands they came from
+        population, fitness = list(population), list(fitness)
+        # Never more than half of the island, so its best players survive
+        worst = list(order[::-1][:len(population) // 2])
+        for _, source, genomes, strat_params, migrant_fitness in sorted(self.wait_for(gen), key=lambda m: m[1]):
+            for genome, strat, value in zip(genomes, strat_params, migrant_fitness):
+                if not worst:
+                    break
+                i = worst.pop(0)
+                population[i] = population[i].with_genome(genome, strat)
+                fitness[i] = value
+        return population, fitness
+
+    def wait_for(self, gen):
+        expected = len(self.model.sources(self.index))
+        messages = [m for m in self.early if m[0] == gen]
+        self.early = [m for m in self.early if m[0] != gen]
+        while len(messages) < expected:
+            message = self.inbox.get(timeout=MIGRATION_TIMEOUT)
+            if message[0] == gen:
+                messages.append(message)
+            else:
+                self.early.append(message)
+        return messages
+
+    def close(self):
+        self.listener.close()
+
+def parse_address(address):
+    host, port = address.rsplit(":", 1)
+    return (host, int(port))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Island model evolution")
+    parser.add_argument("--islands", type=int, default=4)
+    parser.add_argument("--generations", type=int, default=5)
+    parser.add_argument("--population", type=int, default=10, help="population size of each island")
+    parser.add_argument("--workers", type=int, default=1, help="game processes of each island")
+    parser.add_argument("--topology", default=RING, choices=[RING, FULLY_CONNECTED])
+    parser.add_argument("--interval", type=int, default=2, help="generations between migrations")
+    parser.add_argument("--migrants", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--addresses", help="host:port of every island, comma separated, to run one island per machine")
+    parser.add_argument("--index", type=int, help="island to run on this machine (with --addresses)")
+    args = parser.parse_args()
+
+    addresses = [parse_address(a) for a in args.addresses.split(",")] if args.addresses else None
+    model = IslandModel(num_islands=len(addresses) if addresses else args.islands, topology=args.topology,
+                        interval=args.interval, migrants=args.migrants, seed=args.seed, addresses=addresses,
+                        population_size=args.population, workers=args.workers)
+    if args.index is not None:
+        if args.seed is None:
+            sys.exit("Every island needs the same --seed")
+        fitness, genome, strat_params = model.run_island(args.index, args.generations)
+        best = EvoTableAI(**model.player_args(), genome=genome, strat_params=strat_params)
+        save_pickle(best, "best_model_island{}".format(args.index))
+    else:
+        save_pickle(model.run(args.generations))
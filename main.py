@@ -1,12 +1,11 @@
 #!/usr/bin/env python
 
-import io
+import queue
+import threading
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk
 import chess
-import chess.svg
-import cairosvg
+from boardRenderer import BoardRenderer
 
 from AI.randomAI import RandomAI
 from AI.greedyAI import GreedyAI
@@ -15,6 +14,39 @@ from AI.stockfishAI import StockfishAI
 from AI.singleTableAI import SingleTableAI
 from AI.evoTableAI import EvoTableAI
 
+# How often the Tk loop checks for finished searches (ms)
+POLL_MS = 15
+
+"""
+Runs make_move in a background thread so the Tk loop never waits for a search.
+Results are put on a queue as (game id, move, error) for the Tk loop to pick up.
+"""
+class SearchWorker:
+    def __init__(self):
+        self.results = queue.Queue()
+        self.thread = None
+        self.player = None
+
+    # Searching, or a result is waiting to be picked up
+    def busy(self):
+        return (self.thread is not None and self.thread.is_alive()) or not self.results.empty()
+
+    def start(self, player, board, game_id):
+        self.player = player
+        # Search a copy so the displayed board can change meanwhile
+        self.thread = threading.Thread(target=self.search, args=(player, board.copy(), game_id), daemon=True)
+        self.thread.start()
+
+    def search(self, player, board, game_id):
+        try:
+            self.results.put((game_id, player.make_move(board), None))
+        except Exception as error:
+            self.results.put((game_id, None, error))
+
+    def cancel(self):
+        if self.busy():
+            self.player.stop()
+
 class ChessGUI:
     def __init__(self, root):
         self.root = root
@@ -26,13 +58,16 @@ class ChessGUI:
 
         self.chessboard_frame = ttk.Frame(root, width=self.board_size, height=self.board_size)
         self.chessboard_frame.grid(row=0, column=1)
+        self.renderer = BoardRenderer(self.chessboard_frame, self.board_size)
+        self.renderer.canvas.grid(row=0, column=0)
 
         # Create sidebar
         self.side_frame = ttk.Frame(root, width=100, height=self.board_size)
         self.side_frame.grid(row=0, column=0)
 
-        self.white_player = SingleTableAI(depth=2, threads=10)
-        self.black_player = SingleTableAI(depth=2, threads=10)
+        # Each side thinks on the other's time while the other searches in worker processes
+        self.white_player = SingleTableAI(depth=2, threads=10, ponder=True)
+        self.black_player = SingleTableAI(depth=2, threads=10, ponder=True)
 
         self.white_label = ttk.Label(self.side_frame, text=self.white_player.name)
         self.white_label.pack()
@@ -59,15 +94,19 @@ class ChessGUI:
         self.board = chess.Board()
         self.highlighted_square = -1
 
+        # Searches run in the background, results of games that were reset are ignored
+        self.worker = SearchWorker()
+        self.game_id = 0
+        self.playing = False
+        # Players are told about a new game once their last search has finished
+        self.new_game_pending = True
+
         self.draw_chessboard()
+        self.root.after(POLL_MS, self.poll)
 
     def handle_click(self, event):
         # Calculate the row and column from the click event
-        col = event.x // self.square_size
-        row = 7 - (event.y // self.square_size)
-
-        # Get the square from the row and column
-        square = chess.square(col, row)
+        square = self.renderer.square_at(event.x, event.y)
         print("Clicked", square)
 
         # Highlight the clicked square
@@ -82,38 +121,30 @@ class ChessGUI:
         return self.board
 
     def draw_chessboard(self):
-        # Create SVG representation of the current chessboard position
         last_move = self.board.peek() if len(self.board.move_stack) > 0 else None
         squares = [self.highlighted_square] if self.highlighted_square != -1 else None
-        svg_data = chess.svg.board(board=self.board, lastmove=last_move, squares=squares)
-        # Convert SVG data to a PNG image using cairosvg
-        png_data = cairosvg.svg2png(bytestring=svg_data)
-
-        # Remove old board
-        for widget in self.chessboard_frame.winfo_children():
-            widget.destroy()
-
-        # Create a Tkinter PhotoImage from the PNG data
-        img = Image.open(io.BytesIO(png_data))
-        img = ImageTk.PhotoImage(img)
-
-        # Display the chessboard image in a Tkinter Label
-        label = tk.Label(self.chessboard_frame, image=img)
-        label.photo = img  # To prevent garbage collection
-        label.grid(row=0, column=0)
-      
+        # Only the squares that changed are redrawn
+        self.renderer.draw(self.board, lastmove=last_move, squares=squares)
+
         # Bind click events to chessboard
-        # label.bind("<Button-1>", self.handle_click)
+        # self.renderer.canvas.bind("<Button-1>", self.handle_click)
 
     def reset_board(self):
+        self.game_id += 1
+        self.playing = False
+        self.worker.cancel()
+        self.white_player.stop()
+        self.black_player.stop()
+        self.new_game_pending = True
         self.board.reset()
+        self.outcome_label.configure(text="")
         self.draw_chessboard()
 
     def run_simulation(self):
         if self.board.is_game_over():
             self.reset_board()
         self.outcome_label.configure(text="")
-        self.play()
+        self.playing = True
 
     def get_player(self):
         return self.white_player if self.board.turn == chess.WHITE else self.black_player
@@ -121,25 +152,49 @@ class ChessGUI:
     def get_color_str(self):
         return "White" if self.board.turn == chess.WHITE else "Black"
       
-    def play(self):
-        if not self.board.is_game_over():
-            move = self.get_player().make_move(self.board)
-
-            if move not in self.board.legal_moves:
-                print("Illegal Move by", self.get_player().name, move)
-                return
-            
-            self.board.push(move)
-            self.draw_chessboard()
-            
-            self.root.after(1, self.play)
-        else:
+    """
+    Runs every POLL_MS on the Tk loop: applies finished searches and starts the next one
+    """
+    def poll(self):
+        while True:
+            try:
+                game_id, move, error = self.worker.results.get_nowait()
+            except queue.Empty:
+                break
+            if game_id == self.game_id:
+                self.play(move, error)
+
+        if not self.worker.busy():
+            if self.new_game_pending:
+                self.white_player.new_game()
+                self.black_player.new_game()
+                self.new_game_pending = False
+            if self.playing:
+                self.worker.start(self.get_player(), self.board, self.game_id)
+        self.root.after(POLL_MS, self.poll)
+
+    def play(self, move, error=None):
+        if error is not None:
+            print("Search failed for", self.get_player().name, repr(error))
+            self.playing = False
+            return
+
+        if move not in self.board.legal_moves:
+            print("Illegal Move by", self.get_player().name, move)
+            self.playing = False
+            return
+
+        player = self.get_player()
+        self.board.push(move)
+        self.draw_chessboard()
+
+        if self.board.is_game_over():
             print("Outcome", self.board.outcome().result())
             self.outcome_label.configure(text=self.board.outcome().result())
-            self.draw_chessboard()
-    
+            self.playing = False
+        else:
+            player.ponder(self.board)
 
-        
 if __name__ == "__main__":
     root = tk.Tk()
     gui = ChessGUI(root)
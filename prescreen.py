@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+import random
+import chess
+import numpy as np
+from AI.batchEval import bitboards, planes, weight_matrix, score_planes
+from AI.singleTableAI import EVAL_TABLE
+
+SUITE_SEED = 12345
+
+"""
+Surrogate fitness of evaluation tables on a fixed suite of positions, used to drop weak
+offspring before they play any games.
+
+Each table is scored against a reference table (the hand written PST.py by default) by
+- correlation: Pearson correlation of its static evaluations of the suite with the reference's
+- agreement: share of positions where the move it rates best after one ply is the reference's best move
+and the surrogate fitness is the mean of the two. Both only depend on how positions are ranked,
+not on the scale of the values, and are computed for the whole population with two matrix products.
+"""
+class Prescreen():
+
+    def __init__(self, num_positions=256, seed=SUITE_SEED, reference=EVAL_TABLE):
+        boards = suite_positions(num_positions, seed)
+        self.planes = planes([bitboards(board) for board in boards])
+
+        # Children of every position, with the sign that turns white's point of view into the mover's
+        children = []
+        signs = []
+        self.starts = []
+        for board in boards:
+            self.starts.append(len(children))
+            sign = 1 if board.turn == chess.WHITE else -1
+            for move in board.legal_moves:
+                board.push(move)
+                children.append(bitboards(board))
+                signs.append(sign)
+                board.pop()
+        self.child_planes = planes(children)
+        self.child_signs = np.array(signs, dtype=np.float64)[:, None]
+
+        reference_evals, reference_children = self.evaluate([reference])
+        self.reference_evals = reference_evals[:, 0]
+        # Index of the reference's best child of every position
+        ends = self.starts[1:] + [len(children)]
+        self.reference_best = np.array([start + int(np.argmax(reference_children[start:end, 0]))
+                                        for start, end in zip(self.starts, ends)])
+
+    """
+    Static evaluations (white's point of view) of the positions, (N, P), and of their
+    children (side to move's point of view), (M, P), for P tables
+    """
+    def evaluate(self, eval_tables: list):
+        relative = weight_matrix(eval_tables, chess.WHITE) - weight_matrix(eval_tables, chess.BLACK)
+        return score_planes(self.planes, relative), score_planes(self.child_planes, relative) * self.child_signs
+
+    """
+    (P,) surrogate fitness of P tables, higher is better
+    """
+    def score(self, eval_tables: list):
+        evals, children = self.evaluate(eval_tables)
+
+        centered = evals - evals.mean(axis=0)
+        reference = self.reference_evals - self.reference_evals.mean()
+        norms = np.linalg.norm(centered, axis=0) * np.linalg.norm(reference)
+        correlation = np.divide(reference @ centered, norms, out=np.zeros(len(eval_tables)), where=norms > 0)
+
+        best = np.maximum.reduceat(children, self.starts, axis=0)
+        agreement = (children[self.reference_best] >= best).mean(axis=0)
+        return (correlation + agreement) / 2
+
+"""
+Positions from random games with a fixed seed, a few plies apart so they aren't all openings
+"""
+def suite_positions(num_positions, seed=SUITE_SEED):
+    rng = random.Random(seed)
+    positions = []
+    board = chess.Board()
+    while len(positions) < num_positions:
+        if board.is_game_over() or board.ply() > 120:
+            board = chess.Board()
+        board.push(rng.choice(list(board.legal_moves)))
+        if board.ply() >= 8 and rng.random() < 0.2 and not board.is_game_over():
+            positions.append(board.copy(stack=False))
+    return positions
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+
+import random
+import chess
+
+ROUND_ROBIN = "round_robin"
+SWISS = "swiss"
+K_RANDOM = "k_random"
+
+# Search budget for pairings without rematches
+MAX_PAIRING_STEPS = 10000
+
+class ScheduledGame():
+    def __init__(self, white, black, seed):
+        # Indices of the players
+        self.white = white
+        self.black = black
+        self.seed = seed
+        self.outcome = None
+
+"""
+Plans the games of a tournament between num_players players, each unique game is played once
+and its result is credited to both players.
+
+- round_robin: every pair of players meets once
+- k_random: `rounds` rounds of random pairings without repeats where possible
+- swiss: `rounds` rounds pairing players with similar scores who haven't met yet
+
+Colours are balanced so every player's games with white and with black differ by at most one.
+Round robin and k-random games are coloured as a whole. In swiss rounds white goes to the player
+who has had it less often relative to black, and players who would both need the same colour a
+third time aren't paired where possible.
+Games are handed out in batches (one for round robin / k-random, one per round for swiss
+as pairings depend on earlier results) so they can be played on any executor.
+"""
+class Tournament():
+
+    def __init__(self, num_players, mode=K_RANDOM, rounds=2, rng=random):
+        if mode not in (ROUND_ROBIN, SWISS, K_RANDOM):
+            raise ValueError("Unknown tournament mode {}".format(mode))
+        self.num_players = num_players
+        self.mode = mode
+        self.rounds = rounds
+        self.rng = rng
+
+        self.points = [0] * num_players
+        self.games_played = [0] * num_players
+        # Games with white minus games with black of every player
+        self.colour_diff = [0] * num_players
+        self.met = set()
+        self.games = []
+
+    def batches(self):
+        if self.mode == ROUND_ROBIN:
+            pairs = [(a, b) for a in range(self.num_players) for b in range(a + 1, self.num_players)]
+            self.rng.shuffle(pairs)
+            yield self.schedule(pairs)
+        elif self.mode == K_RANDOM:
+            pairs = []
+            for _ in range(self.rounds):
+                round_pairs = self.random_pairing()
+                # Later rounds avoid the pairs drawn so far
+                self.met.update((min(a, b), max(a, b)) for a, b in round_pairs)
+                pairs += round_pairs
+            yield self.schedule(pairs)
+        else:
+            for _ in range(self.rounds):
+                # Results of the previous round must be recorded before pairing the next
+                yield self.schedule(self.swiss_pairing())
+
+    def schedule(self, pairs):
+        batch = []
+        players = [p for pair in pairs for p in pair]
+        one_round = len(players) == len(set(players))
+        if not one_round:
+            # Players meet several opponents in this batch, colour it as a whole
+            pairs = self.balanced_colours(pairs)
+        for a, b in pairs:
+            self.met.add((min(a, b), max(a, b)))
+            # Within a round whoever had white less often relative to black gets white
+            if one_round and (self.colour_diff[a] > self.colour_diff[b] or
+                              (self.colour_diff[a] == self.colour_diff[b] and self.rng.random() < 0.5)):
+                a, b = b, a
+            self.colour_diff[a] += 1
+            self.colour_diff[b] -= 1
+            batch.append(ScheduledGame(a, b, self.rng.getrandbits(64)))
+        self.games += batch
+        return batch
+
+    """
+    Pairs as (white, black) so that every player has at most one game more with one colour than
+    with the other: players with an odd number of games are paired with a dummy (None) as well,
+    then every player is left as often as entered along closed walks over the pairings and
+    gets white in the pairings it leaves by
+    """
+    def balanced_colours(self, pairs):
+        games = [0] * self.num_players
+        for a, b in pairs:
+            games[a] += 1
+            games[b] += 1
+        edges = list(pairs) + [(p, None) for p in range(self.num_players) if games[p] % 2 == 1]
+        incident = {}
+        for i, (a, b) in enumerate(edges):
+            incident.setdefault(a, []).append(i)
+            incident.setdefault(b, []).append(i)
+        for edge_ids in incident.values():
+            self.rng.shuffle(edge_ids)
+        starts = list(incident)
+        self.rng.shuffle(starts)
+
+        used = [False] * len(edges)
+        white = [None] * len(edges)
+        for player in starts:
+            # Every player has an even number of pairings, so each walk ends where it started
+            while True:
+                edge_ids = incident[player]
+                while edge_ids and used[edge_ids[-1]]:
+                    edge_ids.pop()
+                if not edge_ids:
+                    break
+                i = edge_ids.pop()
+                used[i] = True
+                white[i] = player
+                a, b = edges[i]
+                player = b if a == player else a
+        return [(a, b) if white[i] == a else (b, a) for i, (a, b) in enumerate(pairs)]
+
+    def has_met(self, a, b):
+        return (min(a, b), max(a, b)) in self.met
+
+    """
+    Random perfect matching, avoiding rematches where possible
+    """
+    def random_pairing(self):
+        players = list(range(self.num_players))
+        self.rng.shuffle(players)
+        return self.pair_in_order(players)
+
+    """
+    Players sorted by points (random among equal points) paired with the closest opponent they haven't met
+    """
+    def swiss_pairing(self):
+        players = list(range(self.num_players))
+        self.rng.shuffle(players)
+        players.sort(key=lambda p: self.points[p], reverse=True)
+        return self.pair_in_order(players)
+
+    """
+    Pairs each player with the first opponent in players they haven't met, backtracking
+    when that leaves others without one, preferably without pairing two players who are both
+    due the same colour twice over. Only if no such pairing turns up within MAX_PAIRING_STEPS
+    are rematches allowed, greedily in the same order.
+    """
+    def pair_in_order(self, players):
+        for colours in (True, False):
+            pairs = self.pair_unmet(list(players), [MAX_PAIRING_STEPS], colours)
+            if pairs is not None:
+                return pairs
+        pairs = []
+        unpaired = list(players)
+        while len(unpaired) > 1:
+            a = unpaired.pop(0)
+            opponent = next((b for b in unpaired if not self.has_met(a, b)), unpaired[0])
+            unpaired.remove(opponent)
+            pairs.append((a, opponent))
+        # With an odd number of players the last one sits the round out
+        return pairs
+
+    def pair_unmet(self, unpaired, steps, colours=False):
+        if len(unpaired) < 2:
+            return []
+        steps[0] -= 1
+        if steps[0] < 0:
+            return None
+        a, rest = unpaired[0], unpaired[1:]
+        for i, b in enumerate(rest):
+            if not self.has_met(a, b) and not (colours and self.same_colour_due(a, b)):
+                pairs = self.pair_unmet(rest[:i] + rest[i + 1:], steps, colours)
+                if pairs is not None:
+                    return [(a, b)] + pairs
+        if len(unpaired) % 2 == 1:
+            # With an odd number of players someone sits the round out
+            return self.pair_unmet(rest, steps, colours)
+        return None
+
+    """
+    Both players had the same colour at least twice more than the other, so one of them
+    would get it a third time
+    """
+    def same_colour_due(self, a, b):
+        return min(self.colour_diff[a], self.colour_diff[b]) >= 2 or max(self.colour_diff[a], self.colour_diff[b]) <= -2
+
+    def record(self, game: ScheduledGame, outcome):
+        game.outcome = outcome
+        if outcome == chess.WHITE:
+            self.points[game.white] += 1
+        elif outcome == chess.BLACK:
+            self.points[game.black] += 1
+        else:
+            self.points[game.white] += 0.5
+            self.points[game.black] += 0.5
+        self.games_played[game.white] += 1
+        self.games_played[game.black] += 1
+
+    """
+    Points per game played of every player
+    """
+    def fitness(self):
+        return [points / games if games > 0 else 0 for points, games in zip(self.points, self.games_played)]